@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import functools
+import glob
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import gettext_rs
+import make_release
+from utils import info
+
+BOLD_RED = "\033[1;31m"
+GREEN = "\033[32m"
+ENDC = "\033[0m"
+
+
+@dataclass
+class Target:
+    directory: Path
+    new_version: Optional[str] = None
+
+
+@dataclass
+class Outcome:
+    target: Target
+    success: bool
+    log: str
+
+
+def parse_manifest(manifest: Path) -> List[Target]:
+    """Parses a manifest with one `<project dir glob> [new version]` per line.
+
+    Blank lines and lines starting with `#` are ignored, and relative
+    directories are relative to the manifest.
+    """
+
+    targets: List[Target] = []
+
+    with manifest.open() as manifest_file:
+        for line in manifest_file.readlines():
+            line = line.strip()
+
+            if not line or line.startswith("#"):
+                continue
+
+            pattern, _, new_version = line.partition(" ")
+            for directory in expand_directories(str(manifest.parent / pattern)):
+                targets.append(Target(directory, new_version.strip() or None))
+
+    return targets
+
+
+def expand_directories(pattern: str) -> List[Path]:
+    if not glob.has_magic(pattern):
+        return [Path(pattern)]
+
+    return [Path(match) for match in sorted(glob.glob(pattern)) if os.path.isdir(match)]
+
+
+def run_captured(function: Callable[[Target], None], target: Target) -> Outcome:
+    """Runs `function` on the target, capturing its output so it is not interleaved with the others."""
+
+    output = io.StringIO()
+
+    with redirect_stdout(output):
+        try:
+            function(target)
+            success = True
+        except Exception as error:
+            # Not the repr, which drops the path of OSErrors
+            info(f"An error has occured: {type(error).__name__}: {error}")
+            success = False
+
+    return Outcome(target, success, output.getvalue())
+
+
+def generate_pot(target: Target) -> None:
+    project = gettext_rs.Project(
+        target.directory, target.directory / "src", target.directory / "_build"
+    )
+    project.extract_pot_file()
+
+
+def update_release(
+    release_notes: Optional[Tuple[str, List[str]]], target: Target
+) -> None:
+    if target.new_version is None:
+        raise ValueError(f"No new version given for '{target.directory}'")
+
+    project = make_release.Project(target.directory)
+    project.update_version(target.new_version)
+
+    if release_notes is None:
+        info("No release notes given")
+        info("Skipping metainfo release notes update...")
+    else:
+        header, body = release_notes
+        project.write_metainfo_release(header, body)
+
+
+def print_summary(outcomes: List[Outcome]) -> None:
+    for outcome in outcomes:
+        if not outcome.success:
+            print(f"---- {outcome.target.directory} ----")
+            print(outcome.log)
+
+    info("Summary")
+
+    for outcome in outcomes:
+        result = f"{GREEN}ok{ENDC}" if outcome.success else f"{BOLD_RED}FAILED{ENDC}"
+        version = f" ({outcome.target.new_version})" if outcome.target.new_version else ""
+        print(f"{outcome.target.directory}{version} ... {result}")
+
+    n_failed = len([outcome for outcome in outcomes if not outcome.success])
+    info(f"{len(outcomes) - n_failed} succeeded; {n_failed} failed")
+
+
+def main(
+    command: str,
+    targets: List[Target],
+    jobs: Optional[int],
+    notes_file: Optional[Path],
+) -> int:
+    if command == "pot":
+        function: Callable[[Target], None] = generate_pot
+    else:
+        release_notes = make_release.read_release_notes(notes_file) if notes_file is not None else None
+        # A partial of a module level function, so it can be sent to the workers
+        function = functools.partial(update_release, release_notes)
+
+    info(f"Running {command} on {len(targets)} projects...")
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        outcomes = list(executor.map(run_captured, [function] * len(targets), targets))
+
+    print_summary(outcomes)
+
+    return os.EX_OK if all(outcome.success for outcome in outcomes) else 1
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Generate pot files or bump versions of many projects at once"
+    )
+    parser.add_argument(
+        "command",
+        choices=["pot", "release"],
+        help="Either generate the pot files or update the versions and metainfo",
+    )
+    parser.add_argument(
+        "project_dirs",
+        nargs="*",
+        default=[],
+        help="The root directories of the projects. Globs are expanded",
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        type=Path,
+        help="File listing a project directory glob and optionally its new version per line",
+    )
+    parser.add_argument(
+        "-n",
+        "--new-version",
+        type=str,
+        help="The new version of the projects without one in the manifest",
+    )
+    parser.add_argument(
+        "--notes",
+        type=Path,
+        help="Release notes to add to the metainfo, with the header on the first line and an item per line",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of projects to process in parallel. Defaults to the number of cores",
+    )
+    args = parser.parse_args()
+
+    targets = [
+        Target(directory)
+        for pattern in args.project_dirs
+        for directory in expand_directories(pattern)
+    ]
+    if args.manifest is not None:
+        targets += parse_manifest(args.manifest)
+
+    for target in targets:
+        target.new_version = target.new_version or args.new_version
+
+    sys.exit(main(args.command, targets, args.jobs, args.notes))
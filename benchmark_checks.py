@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import statistics
+import tempfile
+import time
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Union
+
+import checks
+from utils import info
+
+STUB_TOOLS = ["cargo", "rustfmt", "typos", "gtk4-builder-tool"]
+
+
+@dataclass
+class ProjectSize:
+    n_rust_files: int
+    n_ui_files: int
+    n_potfiles: int
+    n_resources: int
+
+
+class SyntheticProject:
+    """A generated GTK/Rust project laid out the way checks.py expects.
+
+    The first `n_potfiles` files (ui files first) contain translatable
+    strings and are listed in POTFILES, every tenth Rust file contains a
+    forbidden macro, and the external tools are replaced by stubs that
+    sleep for `tool_delay` seconds and succeed.
+    """
+
+    def __init__(self, directory: Path, size: ProjectSize, tool_delay: float):
+        self.directory = directory
+        self.bin_dir = directory / "_bin"
+        self.size = size
+        self.tool_delay = tool_delay
+
+    def generate(self) -> None:
+        ui_files = self._generate_ui_files()
+        rust_files = self._generate_rust_files(self.size.n_potfiles - len(ui_files))
+
+        potfiles = sorted(str(file) for file in ui_files + rust_files)
+        self._write("po/POTFILES.in", "".join(f"{potfile}\n" for potfile in potfiles))
+
+        self._generate_resources()
+        self._generate_stub_tools()
+
+    def _generate_ui_files(self) -> List[Path]:
+        translatable: List[Path] = []
+
+        for index in range(self.size.n_ui_files):
+            path = Path("data/resources/ui", f"widget_{index:05}.ui")
+
+            if index < self.size.n_potfiles:
+                label = '<property name="label" translatable="yes">Label</property>'
+                translatable.append(path)
+            else:
+                label = '<property name="label">Label</property>'
+
+            self._write(
+                path,
+                f'<?xml version="1.0" encoding="UTF-8"?>\n<interface>\n  <object class="GtkLabel">\n    {label}\n  </object>\n</interface>\n',
+            )
+
+        return translatable
+
+    def _generate_rust_files(self, n_translatable: int) -> List[Path]:
+        translatable: List[Path] = []
+
+        for index in range(self.size.n_rust_files):
+            path = Path("src", f"module_{index // 50:03}", f"file_{index:05}.rs")
+            lines = [f"pub fn function_{index}(value: u32) -> u32 {{"]
+
+            if index < n_translatable:
+                lines.append('    let _label = gettext("Some translatable string");')
+                translatable.append(path)
+
+            if index % 10 == 0:
+                lines.append('    println!("{}", value);')
+
+            lines += [f"    let value_{line} = value + {line};" for line in range(40)]
+            lines += ["    value", "}"]
+
+            self._write(path, "\n".join(lines) + "\n")
+
+        return translatable
+
+    def _generate_resources(self) -> None:
+        files = [f"    <file>ui/widget_{index:05}.ui</file>" for index in range(self.size.n_resources)]
+        self._write(
+            "data/resources/resources.gresource.xml",
+            "\n".join(
+                [
+                    '<?xml version="1.0" encoding="UTF-8"?>',
+                    "<gresources>",
+                    '  <gresource prefix="/org/example/App/">',
+                    *files,
+                    "  </gresource>",
+                    "</gresources>",
+                    "",
+                ]
+            ),
+        )
+
+    def _generate_stub_tools(self) -> None:
+        self.bin_dir.mkdir(parents=True, exist_ok=True)
+
+        for tool in STUB_TOOLS:
+            path = self.bin_dir / tool
+            path.write_text(f"#!/bin/sh\nsleep {self.tool_delay}\necho '{tool} stub'\n")
+            path.chmod(0o755)
+
+    def _write(self, path: Union[Path, str], content: str) -> None:
+        full_path = self.directory / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content)
+
+
+def time_call(function: Callable[[], object], repeat: int) -> float:
+    """Returns the median wall time of calling `function` `repeat` times."""
+
+    durations: List[float] = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+
+        try:
+            function()
+        except checks.CheckError:
+            # The synthetic project purposely contains failures
+            pass
+
+        durations.append(time.perf_counter() - start_time)
+
+    return statistics.median(durations)
+
+
+def run_check(
+    create_check: Callable[[checks.SourceIndex, checks.Potfiles], checks.Check]
+) -> None:
+    # Fresh models, so that each check pays for reading the files it needs
+    create_check(checks.SourceIndex(), checks.Potfiles()).run()
+
+
+def run_runner(jobs: int) -> None:
+    runner = checks.create_runner(checks.parse_args(["--no-cache", "--jobs", str(jobs)]))
+
+    with redirect_stdout(io.StringIO()):
+        runner.run_all()
+
+
+def benchmark(repeat: int, jobs: int) -> None:
+    check_factories: List[Callable[[checks.SourceIndex, checks.Potfiles], checks.Check]] = [
+        lambda _, __: checks.Rustfmt(),
+        lambda _, __: checks.Typos(),
+        lambda _, potfiles: checks.PotfilesAlphabetically(potfiles),
+        lambda _, potfiles: checks.PotfilesExist(potfiles),
+        lambda source_index, potfiles: checks.PotfilesSanity(source_index, potfiles),
+        lambda source_index, _: checks.UiFiles(source_index),
+        lambda _, __: checks.Resources(),
+        lambda source_index, _: checks.ForbiddenPatterns(source_index),
+    ]
+
+    for create_check in check_factories:
+        subject = create_check(checks.SourceIndex(), checks.Potfiles()).subject()
+        duration = time_call(lambda: run_check(create_check), repeat)
+        print(f"{duration:8.3f}s  {subject}")
+
+    duration = time_call(lambda: run_runner(jobs), repeat)
+    print(f"{duration:8.3f}s  full runner ({jobs} jobs)")
+
+
+def main(size: ProjectSize, tool_delay: float, repeat: int, jobs: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="checks-benchmark-") as directory:
+        project = SyntheticProject(Path(directory), size, tool_delay)
+
+        info(f"Generating synthetic project at '{directory}'...")
+        project.generate()
+        info(
+            f"Generated {size.n_rust_files} rust files, {size.n_ui_files} ui files, {size.n_potfiles} potfiles and {size.n_resources} resources"
+        )
+
+        old_cwd = os.getcwd()
+        old_path = os.environ["PATH"]
+
+        os.chdir(directory)
+        os.environ["PATH"] = f"{project.bin_dir}{os.pathsep}{old_path}"
+
+        try:
+            info(f"Timing the median of {repeat} runs...")
+            benchmark(repeat, jobs)
+        finally:
+            os.chdir(old_cwd)
+            os.environ["PATH"] = old_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Time checks.py against a synthetic GTK/Rust project"
+    )
+    parser.add_argument(
+        "--rust-files", type=int, default=1000, help="Number of Rust files in src"
+    )
+    parser.add_argument(
+        "--ui-files", type=int, default=200, help="Number of ui files in data/resources/ui"
+    )
+    parser.add_argument(
+        "--potfiles", type=int, default=500, help="Number of entries in po/POTFILES.in"
+    )
+    parser.add_argument(
+        "--resources", type=int, default=200, help="Number of files in the gresource xml"
+    )
+    parser.add_argument(
+        "--tool-delay",
+        type=float,
+        default=0.0,
+        help="Seconds each stubbed tool (cargo, rustfmt, typos, gtk4-builder-tool) sleeps",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="Number of runs to take the median of"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of checks the full runner runs in parallel",
+    )
+    args = parser.parse_args()
+
+    main(
+        ProjectSize(args.rust_files, args.ui_files, args.potfiles, args.resources),
+        args.tool_delay,
+        args.repeat,
+        args.jobs,
+    )
@@ -1,17 +1,34 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import ctypes
+import functools
 import glob
+import hashlib
+import io
+import json
 import os
+import re
+import select
+import shutil
+import signal
+import socket
+import socketserver
+import struct
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 from abc import ABC, abstractmethod
-from argparse import Namespace
-from dataclasses import dataclass
+from argparse import ArgumentTypeError, Namespace
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
+from contextvars import Context, ContextVar, copy_context
+from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple, TypeVar
 from xml.etree import ElementTree
 
 BOLD_RED = "\033[1;31m"
@@ -24,9 +41,15 @@ ENDC = "\033[0m"
 OK = f"{GREEN}ok{ENDC}"
 FAILED = f"{BOLD_RED}FAILED{ENDC}"
 SKIPPED = f"{BOLD_YELLOW}SKIPPED{ENDC}"
+CANCELLED = f"{BOLD_YELLOW}CANCELLED{ENDC}"
 RUNNING = f"   {BOLD_GREEN}RUNNING{ENDC}"
 ERROR = f"{RED}error{ENDC}"
 
+CACHE_DIRECTORY = Path(".cache/checks")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 class CheckError(Exception, ABC):
     @abstractmethod
@@ -38,6 +61,10 @@ class CheckError(Exception, ABC):
         raise NotImplementedError
 
 
+class CheckCancelledError(Exception):
+    """Raised within a check when the run is cancelled, e.g. after another check failed."""
+
+
 class MissingDependencyError(CheckError):
     def __init__(self, whats_missing: str, install_command: Optional[str] = None):
         self._whats_missing = whats_missing
@@ -72,6 +99,8 @@ class FailedCheckError(CheckError):
 
 
 class Check(ABC):
+    _files: Optional[FrozenSet[Path]] = None
+
     @abstractmethod
     def id(self) -> CheckID:
         """Unique identifier for the check."""
@@ -90,12 +119,42 @@ class Check(ABC):
 
         raise NotImplementedError
 
+    def cache_salt(self) -> Optional[str]:
+        """Anything else the cached outcome depends on, like the stamp of a tool without a version."""
+
+        return None
+
+    def inputs(self) -> Optional[List[Path]]:
+        """The files the outcome of the check depends on.
+
+        If this returns None, the result of the check is never cached.
+        """
+
+        return None
+
     @abstractmethod
     def run(self) -> None:
         """If this method did not raise an error, the check is considered successful."""
 
         raise NotImplementedError
 
+    def restrict_to(self, files: Set[Path]) -> None:
+        """Only check the given files instead of the whole project.
+
+        Checks that can only run on the whole project ignore this.
+        """
+
+        self._files = frozenset(files)
+
+    def _includes(self, path: Path) -> bool:
+        return self._files is None or path in self._files
+
+    def is_affected_by(self, path: Path) -> bool:
+        """Whether a change to `path`, including its creation or removal, may change the outcome."""
+
+        inputs = self.inputs()
+        return inputs is None or path in inputs
+
 
 class CheckID(Enum):
     RUSTFMT = "rustfmt"
@@ -108,387 +167,1194 @@ class CheckID(Enum):
     FORBIDDEN_PATTERNS = "forbidden_patterns"
 
 
-class Rustfmt(Check):
-    """Run rustfmt to enforce code style."""
+@dataclass
+class CheckMetrics:
+    """Resources used while running a check."""
 
-    def id(self) -> CheckID:
-        return CheckID.RUSTFMT
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    n_subprocesses: int = 0
+    bytes_read: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
 
-    def version(self) -> Optional[str]:
-        try:
-            return get_output(["cargo", "fmt", "--version"])
-        except FileNotFoundError:
-            return None
+    def add_cpu_time(self, cpu_time: float) -> None:
+        with self._lock:
+            self.cpu_time += cpu_time
 
-    def subject(self) -> str:
-        return "code style"
+    def add_subprocess(self, cpu_time: float, n_bytes: int) -> None:
+        with self._lock:
+            self.cpu_time += cpu_time
+            self.n_subprocesses += 1
+            self.bytes_read += n_bytes
 
-    def run(self) -> None:
-        try:
-            return_code, output = run_and_get_output(
-                ["cargo", "fmt", "--all", "--", "--check"]
-            )
-        except FileNotFoundError:
-            raise MissingDependencyError(
-                "cargo fmt", install_command="rustup component add rustfmt"
-            )
+    def add_bytes_read(self, n_bytes: int) -> None:
+        with self._lock:
+            self.bytes_read += n_bytes
 
-        if return_code != 0:
-            raise FailedCheckError(
-                error_message=output,
-                suggestion_message="Try running `cargo fmt --all`",
-            )
 
+# The metrics of the check that is running in the current context, if any
+current_metrics: ContextVar[Optional[CheckMetrics]] = ContextVar("current_metrics", default=None)
 
-class Typos(Check):
-    """Run typos to check for spelling mistakes."""
 
-    def id(self) -> CheckID:
-        return CheckID.TYPOS
+class Cancellation:
+    """Cancels a run, terminating the subprocesses of the checks that are running.
 
-    def version(self) -> Optional[str]:
-        try:
-            return_code, output = self._run_typos(["--version"])
+    The subprocesses must lead their own process group, so that the processes
+    they spawned, like the rustfmt of cargo fmt, are terminated too.
+    """
 
-            if return_code != 0:
-                return None
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pids: Set[int] = set()
+        self._cancelled = False
 
-            return output
-        except FileNotFoundError:
-            return None
+    def is_cancelled(self) -> bool:
+        return self._cancelled
 
-    def subject(self) -> str:
-        return "spelling mistakes"
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
 
-    def run(self) -> None:
-        try:
-            return_code, output = self._run_typos(["--color", "always"])
-        except FileNotFoundError:
-            raise MissingDependencyError(
-                "typos", install_command="cargo install typos-cli"
-            )
+            for pid in self._pids:
+                # Not Popen.terminate, which would reap the process if it already exited
+                os.killpg(pid, signal.SIGTERM)
 
-        if return_code != 0:
-            raise FailedCheckError(
-                error_message=output,
-                suggestion_message="Try running `typos -w`",
-            )
+    def register(self, pid: int) -> None:
+        with self._lock:
+            if self._cancelled:
+                os.killpg(pid, signal.SIGTERM)
 
-    @staticmethod
-    def _run_typos(args: List[str]) -> Tuple[int, str]:
-        try:
-            return run_and_get_output(["typos", *args])
-        except FileNotFoundError:
-            typos_full_path = os.path.expanduser("~/.cargo/bin/typos")
-            return run_and_get_output([typos_full_path, *args])
+            self._pids.add(pid)
 
+    def unregister(self, pid: int) -> None:
+        """Must be called after the process exited, but before it is reaped, so its pid is not reused."""
 
-class PotfilesAlphabetically(Check):
-    """Check if files in POTFILES are sorted alphabetically.
+        with self._lock:
+            self._pids.discard(pid)
 
-    This assumes the following:
-        - POTFILES is located at `po/POTFILES.in`
-    """
 
-    def id(self) -> CheckID:
-        return CheckID.POTFILES_ALPHABETICALLY
+# The cancellation of the run the check in the current context belongs to, if any
+current_cancellation: ContextVar[Optional[Cancellation]] = ContextVar("current_cancellation", default=None)
 
-    def version(self) -> None:
-        return None
 
-    def subject(self) -> str:
-        return "po/POTFILES.in alphabetical order"
+class SourceIndex:
+    """Lazily built index of the files in the source directories.
 
-    def run(self) -> None:
-        files = self._get_files()
+    The directories are walked and every file is read only once per run, no
+    matter how many checks scan them.
+    """
 
-        for file, sorted_file in zip(files, sorted(files)):
-            if file != sorted_file:
-                raise FailedCheckError(
-                    error_message=f"{ERROR}: Found file `{file}` before `{sorted_file}` in POTFILES.in",
-                    suggestion_message="Please sort the POTFILES files alphabetically",
-                )
+    def __init__(self, directories: List[str] = ["src", "data/resources/ui"]):
+        self._directories = directories
+        self._contents: Optional[Dict[str, Dict[Path, bytes]]] = None
+        self._lock = threading.Lock()
 
-    @staticmethod
-    def _get_files() -> List[str]:
-        with open("po/POTFILES.in") as potfiles_file:
-            return [line.strip() for line in potfiles_file.readlines()]
+    def files(self, directory: str) -> Dict[Path, bytes]:
+        """Returns the contents of the files in `directory`, keyed by their path."""
 
+        with self._lock:
+            if self._contents is None:
+                self._contents = {
+                    directory: self._read_directory(directory)
+                    for directory in self._directories
+                }
 
-class PotfilesExist(Check):
-    """Check if all files in POTFILES exist.
+            return self._contents[directory]
 
-    This assumes the following:
-        - POTFILES is located at 'po/POTFILES.in'
-    """
+    def files_containing(self, directory: str, regex: Pattern[bytes]) -> List[Path]:
+        """Returns the non-binary files in `directory` that match `regex`."""
 
-    def id(self) -> CheckID:
-        return CheckID.POTFILES_EXIST
+        return [
+            path
+            for path, data in self.files(directory).items()
+            if b"\0" not in data and regex.search(data) is not None
+        ]
 
-    def version(self) -> None:
-        return None
+    def read(self, path: Path) -> Optional[bytes]:
+        """Returns the contents of `path`, or None if it does not exist.
 
-    def subject(self) -> str:
-        return "po/POTFILES.in all files exist"
+        This avoids reading the file again if it is already in the index.
+        """
 
-    def run(self) -> None:
-        files = self._get_non_existent_files()
-        n_files = len(files)
+        for directory in self._directories:
+            if Path(directory) in path.parents:
+                return self.files(directory).get(path)
 
-        if n_files > 0:
-            message = [
-                f"{ERROR}: Found {n_files} file{'s'[:n_files^1]} in POTFILES.in that does not exist:"
-            ]
+        try:
+            return read_file(path)
+        except (FileNotFoundError, IsADirectoryError):
+            return None
 
-            for file in files:
-                message.append(str(file))
+    def invalidate(self, paths: Iterable[Path]) -> None:
+        """Reads the given files again, or forgets them if they were removed."""
 
-            raise FailedCheckError(
-                error_message="\n".join(message),
-                suggestion_message="Make sure that all files in POTFILES exist",
-            )
+        with self._lock:
+            if self._contents is None:
+                return
 
-    @staticmethod
-    def _get_non_existent_files() -> List[Path]:
-        files: List[Path] = []
+            for directory, contents in self._contents.items():
+                changed = [path for path in paths if Path(directory) in path.parents]
 
-        with open("po/POTFILES.in") as potfiles_file:
-            for line in potfiles_file.readlines():
-                file = Path(line.strip())
-                if not file.exists():
-                    files.append(file)
+                for path in changed:
+                    try:
+                        contents[path] = read_file(path)
+                    except (FileNotFoundError, IsADirectoryError):
+                        contents.pop(path, None)
 
-        return files
+                if changed:
+                    # Keep the order of a fresh walk
+                    self._contents[directory] = dict(
+                        sorted(contents.items(), key=lambda item: (str(item[0].parent), item[0].name))
+                    )
 
+    @staticmethod
+    def _read_directory(directory: str) -> Dict[Path, bytes]:
+        paths = [
+            Path(root, name)
+            for root, _, names in sorted(os.walk(directory))
+            for name in sorted(names)
+        ]
 
-class PotfilesSanity(Check):
-    """Check if all files with translatable strings are present and only those.
+        return dict(zip(paths, run_concurrently(read_file, paths)))
 
-    The limitations are the following:
-        - Only detects UI (Glade) or Rust files
 
-    This assumes the following:
-        - POTFILES is located at `po/POTFILES.in`
-        - UI (Glade) files are located in `data/resources/ui` and use `translatable="yes"`
-        - Rust files are located in `src` and use `*gettext` methods or macros
+class Potfiles:
+    """Lazily parsed POTFILES, shared between the checks that need it.
+
+    Blank lines, comments and the encoding line are ignored, and the
+    paths are normalized.
     """
 
-    def id(self) -> CheckID:
-        return CheckID.POTFILES_SANITY
+    def __init__(self, path: Path = Path("po/POTFILES.in")):
+        self.path = path
+        self._files: Optional[List[Path]] = None
+        self._file_set: FrozenSet[Path] = frozenset()
+        self._lock = threading.Lock()
 
-    def version(self) -> None:
-        return None
+    def files(self) -> List[Path]:
+        """Returns the files in the order they are listed."""
 
-    def subject(self) -> str:
-        return "po/POTFILES.in sanity"
+        with self._lock:
+            if self._files is None:
+                self._files = self._parse(read_file(self.path).decode("utf-8"))
+                self._file_set = frozenset(self._files)
 
-    def run(self) -> None:
-        potfiles = self._get_rust_or_ui_potfiles()
-        files_with_translatable = self._get_ui_files() + self._get_rust_files()
+            return self._files
 
-        potfiles_without_translatable = [
-            potfile for potfile in potfiles if potfile not in files_with_translatable
-        ]
-        files_that_should_be_potfile = [
-            file for file in files_with_translatable if file not in potfiles
-        ]
+    def file_set(self) -> FrozenSet[Path]:
+        self.files()
+        return self._file_set
 
-        n_potfiles_without_translatable = len(potfiles_without_translatable)
-        n_files_that_should_be_potfile = len(files_that_should_be_potfile)
+    def invalidate(self) -> None:
+        with self._lock:
+            self._files = None
 
-        message: List[str] = []
+    @staticmethod
+    def _parse(content: str) -> List[Path]:
+        files: List[Path] = []
 
-        if n_potfiles_without_translatable > 0:
-            message.append(
-                f"{ERROR}: Found {n_potfiles_without_translatable} file{'s'[:n_potfiles_without_translatable^1]} in POTFILES.in without translatable strings:"
-            )
+        for line in content.splitlines():
+            line = line.strip()
 
-            for potfile in sorted(potfiles_without_translatable):
-                message.append(str(potfile))
+            if not line or line.startswith("#") or line.startswith("[encoding:"):
+                continue
 
-        if n_potfiles_without_translatable > 0 and n_files_that_should_be_potfile > 0:
-            message.append("")
+            files.append(Path(os.path.normpath(line)))
 
-        if n_files_that_should_be_potfile > 0:
-            message.append(
-                f"{ERROR}: Found {n_files_that_should_be_potfile} file{'s'[:n_files_that_should_be_potfile^1]} with translatable strings not present in POTFILES.in:"
-            )
+        return files
 
-            for file in sorted(files_that_should_be_potfile):
-                message.append(str(file))
 
-        if n_potfiles_without_translatable > 0 or n_files_that_should_be_potfile > 0:
-            raise FailedCheckError(
-                error_message="\n".join(message),
-                suggestion_message="Make sure that POTFILES lists all and only the necessary files",
-            )
+class ResultCache:
+    """On-disk cache of the successful checks.
 
-    @staticmethod
-    def _get_rust_or_ui_potfiles() -> List[Path]:
-        potfiles: List[Path] = []
+    A check is considered unchanged if this script, its id, version, the
+    files it is restricted to and the contents of its inputs are the same
+    as in a previous successful run. Only the
+    `max_entries` most recently used entries are kept, and the keys that are
+    known to be cached are remembered in memory.
+    """
 
-        with open("po/POTFILES.in") as potfiles_file:
-            for line in potfiles_file.readlines():
-                file = Path(line.strip())
+    def __init__(
+        self,
+        source_index: SourceIndex,
+        directory: Path = CACHE_DIRECTORY / "results",
+        max_entries: int = 256,
+    ):
+        self._source_index = source_index
+        self._directory = directory
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._known_keys: Set[str] = set()
 
-                if file.suffix in [".ui", ".rs"]:
-                    potfiles.append(file)
+    def key(self, check: Check) -> Optional[str]:
+        """Returns the key of the current state of the check, or None if it can't be cached."""
 
-        return potfiles
+        inputs = check.inputs()
 
-    @staticmethod
-    def _get_ui_files() -> List[Path]:
-        output = get_output(
-            [
-                "find",
-                "data/resources/ui",
-                "-type",
-                "f",
-                "-exec",
-                "grep",
-                "-lI",
-                'translatable="yes"',
-                "{}",
-                ";",
-            ]
-        )
-        return [Path(line) for line in output.splitlines()]
+        if inputs is None:
+            return None
 
-    @staticmethod
-    def _get_rust_files() -> List[Path]:
-        output = get_output(
-            [
-                "find",
-                "src",
-                "-type",
-                "f",
-                "-exec",
-                "grep",
-                "-lIE",
-                r"gettext\(|gettext_f\(|gettext!\(",
-                "{}",
-                ";",
-            ]
-        )
+        hasher = hashlib.sha256()
+        hasher.update(get_checks_digest())
+        hasher.update(check.id().value.encode())
+        hasher.update(str(check.version()).encode())
+        hasher.update(str(check.cache_salt()).encode())
 
-        # Ignore src/i18n.rs as it contains test cases that are not meant to be translated
-        return [Path(line) for line in output.splitlines() if not line == "src/i18n.rs"]
+        # Not all checks narrow their inputs to the files they are restricted to,
+        # so a restricted run must not pass for a full one
+        if check._files is not None:
+            for path in sorted(check._files):
+                hasher.update(b"restricted:" + str(path).encode() + b"\0")
 
+        for path in sorted(set(inputs)):
+            data = self._source_index.read(path)
+            hasher.update(str(path).encode())
+            hasher.update(b"\0")
+            hasher.update(hashlib.sha256(data).digest() if data is not None else b"missing")
 
-class UiFiles(Check):
-    """Validate ui files using gtk4-builder-tool.
+        return f"{check.id().value}-{hasher.hexdigest()}"
 
-    This ignores errors starting with the following:
-        - Failed to lookup template parent type
-        - Invalid object type
+    def contains(self, key: str) -> bool:
+        if key in self._known_keys:
+            return True
 
-    This assumes the following:
-        - ui files are located in `data/resources/ui/*.ui`
-        - only one gresource in the file
-    """
+        entry = self._directory / key
 
-    def id(self) -> CheckID:
-        return CheckID.UI_FILES
+        try:
+            # Mark it as recently used
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
 
-    def version(self) -> None:
-        return None
+        self._known_keys.add(key)
+        return True
 
-    def subject(self) -> str:
-        return "data/resources/ui/*.ui validity"
+    def insert(self, key: str) -> None:
+        with self._lock:
+            self._known_keys.add(key)
+            ensure_cache_directory(self._directory)
+            (self._directory / key).touch()
+            self._evict()
 
-    def run(self) -> None:
-        errors: List[str] = []
+    def _evict(self) -> None:
+        entries: List[Tuple[int, str]] = []
 
-        for ui_file in glob.glob("data/resources/ui/*.ui"):
+        # Another run may be evicting the same entries concurrently
+        for entry in os.scandir(self._directory):
             try:
-                return_code, output = run_and_get_output(
-                    ["gtk4-builder-tool", "validate", ui_file]
-                )
+                entries.append((entry.stat().st_mtime_ns, entry.path))
             except FileNotFoundError:
-                raise MissingDependencyError(
-                    "gtk4-devel", install_command="sudo dnf install gtk4-devel"
-                )
-
-            if (
-                return_code != 0
-                and "Failed to lookup template parent type" not in output
-                and "Invalid object type" not in output
-            ):
-                errors.append(f"> {ui_file} <\n{output}\n")
+                pass
 
-        if len(errors) != 0:
-            raise FailedCheckError(
-                error_message="\n".join(errors),
-                suggestion_message="Please fix the given errors on the ui files",
-            )
+        for _, path in sorted(entries, reverse=True)[self._max_entries:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
 
-class Resources(Check):
-    """Check if files in data/resources/resources.gresource.xml are sorted alphabetically.
+class FileOutcomeCache:
+    """On-disk cache of the outcome of a check on single files.
 
-    This assumes the following:
-        - gresource file is located in `data/resources/resources.gresource.xml`
-        - only one gresource in the file
+    Outcomes are keyed by the hash of the file contents and `salt`, which
+    should identify the tool that produced them. Only the `max_entries` most
+    recently used entries are kept.
     """
 
-    def id(self) -> CheckID:
-        return CheckID.RESOURCES
+    def __init__(self, path: Path, salt: str, max_entries: int = 4096):
+        self._path = path
+        self._salt = salt
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
 
-    def version(self) -> None:
-        return None
+        try:
+            with path.open() as file:
+                self._entries: Dict[str, str] = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
 
-    def subject(self) -> str:
-        return "data/resources/resources.gresource.xml"
+    def get(self, data: bytes) -> Optional[str]:
+        key = self._key(data)
 
-    def run(self) -> None:
-        tree = ElementTree.parse("data/resources/resources.gresource.xml")
-        gresource = tree.find("gresource")
+        with self._lock:
+            outcome = self._entries.pop(key, None)
 
-        if gresource is None:
-            return
+            # Reinsert it at the end to mark it as recently used
+            if outcome is not None:
+                self._entries[key] = outcome
 
-        files = [element.text for element in gresource.findall("file") if element.text]
-        sorted_files = sorted(files, key=lambda f: Path(f).with_suffix(""))
+            return outcome
 
-        for file, sorted_file in zip(files, sorted_files):
-            if file != sorted_file:
-                raise FailedCheckError(
-                    error_message=f"{ERROR}: Found file `{file}` before `{sorted_file}` in resources.gresource.xml",
-                    suggestion_message="Please sort the resources alphabetically",
-                )
+    def insert(self, data: bytes, outcome: str) -> None:
+        key = self._key(data)
 
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = outcome
 
-class ForbiddenPatterns(Check):
-    """Checks for forbidden patterns in the src directory."""
+    def save(self) -> None:
+        with self._lock:
+            entries = dict(list(self._entries.items())[-self._max_entries:])
 
-    @dataclass
-    class Match:
-        path: Path
-        line_number: int
-        column_number: int
-        pattern: str
+        write_cache_file(self._path, entries)
 
-    def id(self) -> CheckID:
-        return CheckID.FORBIDDEN_PATTERNS
+    def _key(self, data: bytes) -> str:
+        return hashlib.sha256(self._salt.encode() + b"\0" + data).hexdigest()
 
-    def version(self) -> None:
-        return None
 
-    def subject(self) -> str:
-        joined = ", ".join(self._get_patterns())
-        return f"no {joined}"
+@dataclass
+class Tool:
+    executable: str
+    version_args: Optional[List[str]] = None
+    fallbacks: List[str] = field(default_factory=list)
 
-    def run(self) -> None:
-        matches = self._get_matches(self._get_patterns())
-        n_matches = len(matches)
 
-        if n_matches > 0:
-            message = [
-                f"{ERROR}: Found {n_matches} forbidden pattern{'s'[:n_matches^1]}:"
-            ]
+TOOLS: Dict[str, Tool] = {
+    "cargo-fmt": Tool("cargo", version_args=["fmt", "--version"]),
+    "rustfmt": Tool("rustfmt"),
+    "typos": Tool("typos", version_args=["--version"], fallbacks=["~/.cargo/bin/typos"]),
+    "gtk4-builder-tool": Tool("gtk4-builder-tool"),
+}
 
-            for match in matches:
-                message.append(
+
+class ToolRegistry:
+    """Resolves the tools in TOOLS and probes their versions only once.
+
+    The executables are looked up in PATH, then in their fallbacks. With
+    `cache_path`, the resolved paths and versions are persisted, and reused
+    as long as PATH, the rustup toolchains and the modification time and
+    size of the executable stay the same.
+    """
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        self._cache_path = cache_path
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Optional[str]] = {}
+        self._versions: Dict[str, Optional[str]] = {}
+
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Whether an entry was added or replaced since the last save
+        self._dirty = False
+
+        if cache_path is not None:
+            try:
+                with cache_path.open() as file:
+                    self._entries = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Returns the path of the executable of the tool, or None if it is not installed."""
+
+        with self._lock:
+            if name not in self._paths:
+                entry = self._valid_entry(name)
+                self._paths[name] = entry["path"] if entry else self._find(TOOLS[name])
+
+            return self._paths[name]
+
+    def version(self, name: str) -> Optional[str]:
+        """Returns the version of the tool, or None if it is not installed or has none."""
+
+        path = self.resolve(name)
+
+        with self._lock:
+            if name in self._versions:
+                return self._versions[name]
+
+            entry = self._valid_entry(name)
+
+        if path is None:
+            version = None
+        elif entry is not None:
+            version = entry["version"]
+        else:
+            version = self._probe(TOOLS[name], path)
+
+            with self._lock:
+                self._entries[name] = {"path": path, "stamp": self._stamp(path), "version": version}
+                self._dirty = True
+
+        with self._lock:
+            self._versions[name] = version
+
+        return version
+
+    def probe_versions(self) -> None:
+        """Probes the versions of all the tools concurrently, then persists the new ones."""
+
+        run_concurrently(self.version, list(TOOLS))
+        self.save()
+
+    def save(self) -> None:
+        if self._cache_path is None:
+            return
+
+        with self._lock:
+            if not self._dirty:
+                return
+
+            entries = dict(self._entries)
+            self._dirty = False
+
+        write_cache_file(self._cache_path, entries)
+
+    def _valid_entry(self, name: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(name)
+
+        if entry is None or entry["stamp"] != self._stamp(entry["path"]):
+            return None
+
+        return entry
+
+    @staticmethod
+    def _find(tool: Tool) -> Optional[str]:
+        path = shutil.which(tool.executable)
+
+        for fallback in tool.fallbacks:
+            if path is None:
+                path = shutil.which(os.path.expanduser(fallback))
+
+        return path
+
+    @staticmethod
+    def _probe(tool: Tool, path: str) -> Optional[str]:
+        if tool.version_args is None:
+            return None
+
+        try:
+            return get_output([path, *tool.version_args])
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[str]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        stamp = f"{os.environ.get('PATH')}:{stat.st_mtime_ns}:{stat.st_size}:{get_rustup_stamp()}"
+        return hashlib.sha256(stamp.encode()).hexdigest()
+
+
+@dataclass
+class SharedState:
+    """The indexes and caches shared by the checks, which can be kept between runs."""
+
+    source_index: SourceIndex
+    potfiles: Potfiles
+    result_cache: Optional[ResultCache]
+    tools: ToolRegistry
+
+    @staticmethod
+    def create(use_cache: bool) -> SharedState:
+        source_index = SourceIndex()
+        return SharedState(
+            source_index,
+            Potfiles(),
+            ResultCache(source_index) if use_cache else None,
+            ToolRegistry(CACHE_DIRECTORY / "tools.json" if use_cache else None),
+        )
+
+    def invalidate(self, paths: Set[Path]) -> None:
+        """Updates the state after the given files changed, were created or removed."""
+
+        self.source_index.invalidate(paths)
+
+        if self.potfiles.path in paths:
+            self.potfiles.invalidate()
+
+        get_project_files.cache_clear()
+
+
+class Rustfmt(Check):
+    """Run rustfmt to enforce code style.
+
+    By default, this runs `cargo fmt` on the whole workspace. With `parallel`,
+    or when restricted to some files, rustfmt is instead run directly on
+    batches of the Rust files spread across the cores, and the diffs of each
+    file are cached by its contents.
+    """
+
+    @dataclass
+    class Diff:
+        path: Path
+        line_number: int
+        lines: List[str]
+
+    SKIP_CHILDREN_WARNING = "Warning: can't set `skip_children"
+
+    DIFF_HEADER_REGEX = re.compile(r"^Diff in (?P<path>.+?)(?: at line |:)(?P<line_number>\d+):$")
+
+    def __init__(
+        self,
+        parallel: bool = False,
+        cache_path: Optional[Path] = None,
+        tools: Optional[ToolRegistry] = None,
+    ):
+        self._parallel = parallel
+        self._cache_path = cache_path
+        self._tools = tools or ToolRegistry()
+
+    def id(self) -> CheckID:
+        return CheckID.RUSTFMT
+
+    def version(self) -> Optional[str]:
+        return self._tools.version("cargo-fmt")
+
+    def subject(self) -> str:
+        return "code style"
+
+    def inputs(self) -> Optional[List[Path]]:
+        files = get_project_files()
+
+        if files is None:
+            return None
+
+        return [
+            file
+            for file in files
+            if (file.suffix == ".rs" and self._includes(file))
+            or file.name in ("Cargo.toml", "rustfmt.toml", ".rustfmt.toml")
+        ]
+
+    def is_affected_by(self, path: Path) -> bool:
+        return path.suffix == ".rs" or path.name in ("Cargo.toml", "rustfmt.toml", ".rustfmt.toml")
+
+    def run(self) -> None:
+        if self._files is None and not self._parallel:
+            self._run_cargo_fmt()
+            return
+
+        rust_files = self._get_rust_files()
+
+        if len(rust_files) == 0:
+            return
+
+        diffs, errors = self._check_files(rust_files)
+
+        if len(errors) > 0:
+            raise FailedCheckError(
+                error_message="\n".join(errors),
+                suggestion_message="Please fix the errors reported by rustfmt",
+            )
+
+        if len(diffs) > 0:
+            raise FailedCheckError(
+                error_message="\n".join(
+                    "\n".join([f"Diff in {diff.path}:{diff.line_number}:", *diff.lines])
+                    for diff in diffs
+                ),
+                suggestion_message="Try running `cargo fmt --all`",
+            )
+
+    def _run_cargo_fmt(self) -> None:
+        cargo = self._tools.resolve("cargo-fmt")
+
+        try:
+            if cargo is None:
+                raise FileNotFoundError("cargo")
+
+            return_code, output = run_and_get_output([cargo, "fmt", "--all", "--", "--check"])
+        except FileNotFoundError:
+            raise MissingDependencyError(
+                "cargo fmt", install_command="rustup component add rustfmt"
+            )
+
+        if return_code != 0:
+            raise FailedCheckError(
+                error_message=output,
+                suggestion_message="Try running `cargo fmt --all`",
+            )
+
+    def _get_rust_files(self) -> List[Path]:
+        if self._files is not None:
+            files: Iterable[Path] = self._files
+        else:
+            files = get_project_files() or [
+                Path(root, name) for root, _, names in os.walk("src") for name in names
+            ]
+
+        return sorted(file for file in files if file.suffix == ".rs" and file.exists())
+
+    def _check_files(self, rust_files: List[Path]) -> Tuple[List[Diff], List[str]]:
+        """Returns the diffs rustfmt would apply to the files, in their order, and its errors.
+
+        The files of the batches rustfmt failed on are not cached.
+        """
+
+        tool = self._tools.resolve("rustfmt")
+
+        if tool is None:
+            raise MissingDependencyError(
+                "rustfmt", install_command="rustup component add rustfmt"
+            )
+
+        # Otherwise the batch with main.rs or lib.rs would check the whole crate by itself
+        args = [
+            tool,
+            "--check",
+            "--color",
+            "never",
+            "--config",
+            "skip_children=true",
+            *get_rustfmt_edition_args(),
+        ]
+        cache = self._get_cache(tool, args)
+
+        contents = {file: read_file(file) for file in rust_files}
+        cached = {
+            file: outcome
+            for file, outcome in (
+                (file, cache.get(data) if cache is not None else None)
+                for file, data in contents.items()
+            )
+            if outcome is not None
+        }
+        uncached = [file for file in rust_files if file not in cached]
+
+        n_batches = min(len(uncached), os.cpu_count() or 1)
+        batches = [uncached[index::n_batches] for index in range(n_batches)]
+
+        results = run_concurrently(lambda batch: self._run_batch(args, batch), batches)
+
+        diffs = [diff for batch_diffs, _ in results for diff in batch_diffs]
+        errors = [error for _, error in results if error is not None]
+        failed_files = {
+            file for batch, (_, error) in zip(batches, results) if error is not None for file in batch
+        }
+
+        outcomes = {**cached, **self._group_outcomes(uncached, diffs)}
+
+        if cache is not None:
+            for file in uncached:
+                if file not in failed_files:
+                    cache.insert(contents[file], outcomes[file])
+            cache.save()
+
+        return (
+            [
+                Rustfmt.Diff(file, line_number, lines)
+                for file in rust_files
+                for line_number, lines in json.loads(outcomes[file])
+            ],
+            errors,
+        )
+
+    def _get_cache(self, tool: str, args: List[str]) -> Optional[FileOutcomeCache]:
+        if self._cache_path is None:
+            return None
+
+        stat = os.stat(tool)
+        config = [read_file(Path(name)) for name in ("rustfmt.toml", ".rustfmt.toml") if os.path.exists(name)]
+
+        return FileOutcomeCache(
+            self._cache_path,
+            salt=f"{stat.st_mtime_ns}:{stat.st_size}:{args}:{hashlib.sha256(b''.join(config)).hexdigest()}",
+        )
+
+    def _run_batch(self, args: List[str], batch: List[Path]) -> Tuple[List[Diff], Optional[str]]:
+        """Returns the diffs of the files in the batch and the errors, if rustfmt failed on any."""
+
+        return_code, stdout, stderr = run_process([*args, *(str(file) for file in batch)])
+        diffs = self._parse_diffs(stdout.decode("utf-8"))
+        errors = "\n".join(
+            line
+            for line in stderr.decode("utf-8").splitlines()
+            # Older rustfmt only has it on nightly, and then checks the children too
+            if not line.startswith(self.SKIP_CHILDREN_WARNING)
+        ).strip()
+
+        if return_code != 0 and (errors or len(diffs) == 0):
+            return (diffs, errors or f"rustfmt exited with code {return_code}")
+
+        return (diffs, None)
+
+    @staticmethod
+    def _group_outcomes(files: List[Path], diffs: List[Diff]) -> Dict[Path, str]:
+        """Returns the diffs of each file as a JSON list, which is what gets cached.
+
+        Files can appear in the diffs of several batches, as rustfmt versions
+        without `skip_children` also check the submodules of the files they
+        are given, so duplicates are dropped.
+        """
+
+        outcomes: Dict[Path, List[Tuple[int, List[str]]]] = {file: [] for file in files}
+
+        for diff in diffs:
+            outcome = outcomes.get(diff.path)
+
+            if outcome is not None and (diff.line_number, diff.lines) not in outcome:
+                outcome.append((diff.line_number, diff.lines))
+
+        return {
+            file: json.dumps(sorted(outcome, key=lambda diff: diff[0]))
+            for file, outcome in outcomes.items()
+        }
+
+    @staticmethod
+    def _parse_diffs(output: str) -> List[Diff]:
+        diffs: List[Rustfmt.Diff] = []
+
+        for line in output.splitlines():
+            header = Rustfmt.DIFF_HEADER_REGEX.match(line)
+
+            if header is not None:
+                path = Path(os.path.relpath(header.group("path")))
+                diffs.append(Rustfmt.Diff(path, int(header.group("line_number")), []))
+            elif len(diffs) > 0:
+                diffs[-1].lines.append(line)
+
+        return diffs
+
+
+class Typos(Check):
+    """Run typos to check for spelling mistakes."""
+
+    def __init__(self, tools: Optional[ToolRegistry] = None):
+        self._tools = tools or ToolRegistry()
+
+    def id(self) -> CheckID:
+        return CheckID.TYPOS
+
+    def version(self) -> Optional[str]:
+        return self._tools.version("typos")
+
+    def subject(self) -> str:
+        return "spelling mistakes"
+
+    def inputs(self) -> Optional[List[Path]]:
+        return get_project_files()
+
+    def is_affected_by(self, path: Path) -> bool:
+        return True
+
+    def run(self) -> None:
+        files: List[str] = []
+
+        if self._files is not None:
+            files = [str(file) for file in sorted(self._files) if file.exists()]
+
+            if len(files) == 0:
+                return
+
+            # Explicit paths would otherwise bypass the excludes of the typos config
+            files.insert(0, "--force-exclude")
+
+        try:
+            return_code, output = self._run_typos(["--color", "always", *files])
+        except FileNotFoundError:
+            raise MissingDependencyError(
+                "typos", install_command="cargo install typos-cli"
+            )
+
+        if return_code != 0:
+            raise FailedCheckError(
+                error_message=output,
+                suggestion_message="Try running `typos -w`",
+            )
+
+    def _run_typos(self, args: List[str]) -> Tuple[int, str]:
+        typos = self._tools.resolve("typos")
+
+        if typos is None:
+            raise FileNotFoundError("typos")
+
+        return run_and_get_output([typos, *args])
+
+
+class PotfilesAlphabetically(Check):
+    """Check if files in POTFILES are sorted alphabetically.
+
+    This assumes the following:
+        - POTFILES is located at `po/POTFILES.in`
+    """
+
+    def __init__(self, potfiles: Potfiles):
+        self._potfiles = potfiles
+
+    def id(self) -> CheckID:
+        return CheckID.POTFILES_ALPHABETICALLY
+
+    def version(self) -> None:
+        return None
+
+    def subject(self) -> str:
+        return "po/POTFILES.in alphabetical order"
+
+    def inputs(self) -> List[Path]:
+        return [self._potfiles.path]
+
+    def run(self) -> None:
+        # As strings, like `sort` does, since paths are compared a component at a time
+        files = [str(file) for file in self._potfiles.files()]
+
+        for file, sorted_file in zip(files, sorted(files)):
+            if file != sorted_file:
+                raise FailedCheckError(
+                    error_message=f"{ERROR}: Found file `{file}` before `{sorted_file}` in POTFILES.in",
+                    suggestion_message="Please sort the POTFILES files alphabetically",
+                )
+
+
+class PotfilesExist(Check):
+    """Check if all files in POTFILES exist.
+
+    This assumes the following:
+        - POTFILES is located at 'po/POTFILES.in'
+    """
+
+    def __init__(self, potfiles: Potfiles):
+        self._potfiles = potfiles
+
+    def id(self) -> CheckID:
+        return CheckID.POTFILES_EXIST
+
+    def version(self) -> None:
+        return None
+
+    def subject(self) -> str:
+        return "po/POTFILES.in all files exist"
+
+    def inputs(self) -> List[Path]:
+        return [self._potfiles.path, *self._potfiles.files()]
+
+    def run(self) -> None:
+        files = self._get_non_existent_files()
+        n_files = len(files)
+
+        if n_files > 0:
+            message = [
+                f"{ERROR}: Found {n_files} file{'s'[:n_files^1]} in POTFILES.in that does not exist:"
+            ]
+
+            for file in files:
+                message.append(str(file))
+
+            raise FailedCheckError(
+                error_message="\n".join(message),
+                suggestion_message="Make sure that all files in POTFILES exist",
+            )
+
+    def _get_non_existent_files(self) -> List[Path]:
+        files = self._potfiles.files()
+
+        # List each directory once instead of stating every file, which is a
+        # round trip per file on network filesystems
+        directories = sorted({file.parent for file in files})
+        existing_files = set().union(*run_concurrently(self._list_directory, directories))
+
+        return [file for file in files if file not in existing_files]
+
+    @staticmethod
+    def _list_directory(directory: Path) -> Set[Path]:
+        try:
+            with os.scandir(directory) as entries:
+                return {
+                    directory / entry.name
+                    for entry in entries
+                    # Broken symlinks don't count as existing
+                    if not entry.is_symlink() or os.path.exists(entry.path)
+                }
+        except (FileNotFoundError, NotADirectoryError):
+            return set()
+
+
+class PotfilesSanity(Check):
+    """Check if all files with translatable strings are present and only those.
+
+    The limitations are the following:
+        - Only detects UI (Glade) or Rust files
+
+    This assumes the following:
+        - POTFILES is located at `po/POTFILES.in`
+        - UI (Glade) files are located in `data/resources/ui` and use `translatable="yes"`
+        - Rust files are located in `src` and use `*gettext` methods or macros
+    """
+
+    def __init__(self, source_index: SourceIndex, potfiles: Potfiles):
+        self._source_index = source_index
+        self._potfiles = potfiles
+
+    def id(self) -> CheckID:
+        return CheckID.POTFILES_SANITY
+
+    def version(self) -> None:
+        return None
+
+    def subject(self) -> str:
+        return "po/POTFILES.in sanity"
+
+    def inputs(self) -> List[Path]:
+        return [
+            self._potfiles.path,
+            *self._source_index.files("data/resources/ui"),
+            *self._source_index.files("src"),
+        ]
+
+    def is_affected_by(self, path: Path) -> bool:
+        return path == self._potfiles.path or path.suffix in (".rs", ".ui")
+
+    def run(self) -> None:
+        potfiles = self._get_rust_or_ui_potfiles()
+        files_with_translatable = set(self._get_ui_files() + self._get_rust_files())
+
+        # Everything has to be compared again when POTFILES itself changed
+        if self._files is not None and not self._includes(self._potfiles.path):
+            potfiles &= self._files
+            files_with_translatable &= self._files
+
+        potfiles_without_translatable = potfiles - files_with_translatable
+        files_that_should_be_potfile = files_with_translatable - potfiles
+
+        n_potfiles_without_translatable = len(potfiles_without_translatable)
+        n_files_that_should_be_potfile = len(files_that_should_be_potfile)
+
+        message: List[str] = []
+
+        if n_potfiles_without_translatable > 0:
+            message.append(
+                f"{ERROR}: Found {n_potfiles_without_translatable} file{'s'[:n_potfiles_without_translatable^1]} in POTFILES.in without translatable strings:"
+            )
+
+            for potfile in sorted(potfiles_without_translatable):
+                message.append(str(potfile))
+
+        if n_potfiles_without_translatable > 0 and n_files_that_should_be_potfile > 0:
+            message.append("")
+
+        if n_files_that_should_be_potfile > 0:
+            message.append(
+                f"{ERROR}: Found {n_files_that_should_be_potfile} file{'s'[:n_files_that_should_be_potfile^1]} with translatable strings not present in POTFILES.in:"
+            )
+
+            for file in sorted(files_that_should_be_potfile):
+                message.append(str(file))
+
+        if n_potfiles_without_translatable > 0 or n_files_that_should_be_potfile > 0:
+            raise FailedCheckError(
+                error_message="\n".join(message),
+                suggestion_message="Make sure that POTFILES lists all and only the necessary files",
+            )
+
+    def _get_rust_or_ui_potfiles(self) -> Set[Path]:
+        return {
+            file for file in self._potfiles.file_set() if file.suffix in [".ui", ".rs"]
+        }
+
+    def _get_ui_files(self) -> List[Path]:
+        return self._source_index.files_containing(
+            "data/resources/ui", re.compile(rb'translatable="yes"')
+        )
+
+    def _get_rust_files(self) -> List[Path]:
+        files = self._source_index.files_containing(
+            "src", re.compile(rb"gettext\(|gettext_f\(|gettext!\(")
+        )
+
+        # Ignore src/i18n.rs as it contains test cases that are not meant to be translated
+        return [file for file in files if file != Path("src/i18n.rs")]
+
+
+class UiFiles(Check):
+    """Validate ui files using gtk4-builder-tool.
+
+    This ignores errors starting with the following:
+        - Failed to lookup template parent type
+        - Invalid object type
+
+    This assumes the following:
+        - ui files are located in `data/resources/ui/*.ui`
+        - only one gresource in the file
+    """
+
+    def __init__(
+        self,
+        source_index: SourceIndex,
+        cache_path: Optional[Path] = None,
+        tools: Optional[ToolRegistry] = None,
+    ):
+        self._source_index = source_index
+        self._cache_path = cache_path
+        self._tools = tools or ToolRegistry()
+
+    def id(self) -> CheckID:
+        return CheckID.UI_FILES
+
+    def version(self) -> None:
+        return None
+
+    def cache_salt(self) -> Optional[str]:
+        """The path, modification time and size of gtk4-builder-tool, as it has no version."""
+
+        tool = self._tools.resolve("gtk4-builder-tool")
+
+        if tool is None:
+            return None
+
+        stat = os.stat(tool)
+        return f"{tool}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def subject(self) -> str:
+        return "data/resources/ui/*.ui validity"
+
+    def inputs(self) -> List[Path]:
+        return [
+            Path(ui_file)
+            for ui_file in glob.glob("data/resources/ui/*.ui")
+            if self._includes(Path(ui_file))
+        ]
+
+    def run(self) -> None:
+        ui_files = self.inputs()
+
+        if len(ui_files) == 0:
+            return
+
+        tool = self._tools.resolve("gtk4-builder-tool")
+
+        if tool is None:
+            raise MissingDependencyError(
+                "gtk4-devel", install_command="sudo dnf install gtk4-devel"
+            )
+
+        cache = self._get_cache()
+
+        # Each validation is a separate process, so threads are enough to spread them
+        outcomes = run_concurrently(
+            lambda ui_file: self._validate(tool, ui_file, cache), ui_files
+        )
+
+        if cache is not None:
+            cache.save()
+
+        errors = [
+            f"> {ui_file} <\n{outcome}\n"
+            for ui_file, outcome in zip(ui_files, outcomes)
+            if outcome
+        ]
+
+        if len(errors) != 0:
+            raise FailedCheckError(
+                error_message="\n".join(errors),
+                suggestion_message="Please fix the given errors on the ui files",
+            )
+
+    def _get_cache(self) -> Optional[FileOutcomeCache]:
+        salt = self.cache_salt()
+
+        if self._cache_path is None or salt is None:
+            return None
+
+        return FileOutcomeCache(self._cache_path, salt=salt)
+
+    def _validate(self, tool: str, ui_file: Path, cache: Optional[FileOutcomeCache]) -> str:
+        """Returns the errors found in the file, or an empty string if it is valid."""
+
+        data = self._source_index.read(ui_file) or b""
+
+        if cache is not None:
+            outcome = cache.get(data)
+
+            if outcome is not None:
+                return outcome
+
+        return_code, output = run_and_get_output([tool, "validate", str(ui_file)])
+
+        if (
+            return_code != 0
+            and "Failed to lookup template parent type" not in output
+            and "Invalid object type" not in output
+        ):
+            outcome = output or f"gtk4-builder-tool exited with code {return_code}"
+        else:
+            outcome = ""
+
+        if cache is not None:
+            cache.insert(data, outcome)
+
+        return outcome
+
+
+class Resources(Check):
+    """Check if files in data/resources/resources.gresource.xml are sorted alphabetically.
+
+    This assumes the following:
+        - gresource file is located in `data/resources/resources.gresource.xml`
+        - only one gresource in the file
+    """
+
+    def id(self) -> CheckID:
+        return CheckID.RESOURCES
+
+    def version(self) -> None:
+        return None
+
+    def subject(self) -> str:
+        return "data/resources/resources.gresource.xml"
+
+    def inputs(self) -> List[Path]:
+        return [Path("data/resources/resources.gresource.xml")]
+
+    def run(self) -> None:
+        tree = ElementTree.parse("data/resources/resources.gresource.xml")
+        gresource = tree.find("gresource")
+
+        if gresource is None:
+            return
+
+        files = [element.text for element in gresource.findall("file") if element.text]
+        sorted_files = sorted(files, key=lambda f: Path(f).with_suffix(""))
+
+        for file, sorted_file in zip(files, sorted_files):
+            if file != sorted_file:
+                raise FailedCheckError(
+                    error_message=f"{ERROR}: Found file `{file}` before `{sorted_file}` in resources.gresource.xml",
+                    suggestion_message="Please sort the resources alphabetically",
+                )
+
+
+class ForbiddenPatterns(Check):
+    """Checks for forbidden patterns in the src directory."""
+
+    @dataclass
+    class Match:
+        path: Path
+        line_number: int
+        column_number: int
+        pattern: str
+
+    def __init__(self, source_index: SourceIndex):
+        self._source_index = source_index
+
+    def id(self) -> CheckID:
+        return CheckID.FORBIDDEN_PATTERNS
+
+    def version(self) -> None:
+        return None
+
+    def subject(self) -> str:
+        joined = ", ".join(self._get_patterns())
+        return f"no {joined}"
+
+    def inputs(self) -> List[Path]:
+        return [path for path in self._source_index.files("src") if self._includes(path)]
+
+    def is_affected_by(self, path: Path) -> bool:
+        return Path("src") in path.parents
+
+    def run(self) -> None:
+        matches = self._get_matches(self._get_patterns())
+        n_matches = len(matches)
+
+        if n_matches > 0:
+            message = [
+                f"{ERROR}: Found {n_matches} forbidden pattern{'s'[:n_matches^1]}:"
+            ]
+
+            for match in matches:
+                message.append(
                     f"found `{match.pattern}` at {match.path}:{match.line_number}:{match.column_number}"
                 )
 
@@ -497,238 +1363,1282 @@ class ForbiddenPatterns(Check):
                 suggestion_message="Please use `log::*` macros instead for logging or implement todo!",
             )
 
-    @staticmethod
-    def _get_patterns() -> List[str]:
-        gettext_macro_patterns = [
-            "dcgettext!",
-            "dcngettext!",
-            "dgettext!",
-            "dngettext!",
-            "gettext!",
-            "ngettext!",
-            "npgettext!",
-            "pgettext!"
-        ]
+    @staticmethod
+    def _get_patterns() -> List[str]:
+        gettext_macro_patterns = [
+            "dcgettext!",
+            "dcngettext!",
+            "dgettext!",
+            "dngettext!",
+            "gettext!",
+            "ngettext!",
+            "npgettext!",
+            "pgettext!"
+        ]
+
+        return ["dbg!", "println!", "print!", "todo!", *gettext_macro_patterns]
+
+    def _get_matches(self, patterns: List[str]) -> List[Match]:
+        # Longest first so that a pattern is never shadowed by one of its prefixes
+        regex = re.compile(
+            "|".join(re.escape(pattern) for pattern in sorted(patterns, key=len, reverse=True)).encode()
+        )
+
+        return [
+            match
+            for path, data in self._source_index.files("src").items()
+            if self._includes(path)
+            for match in self._get_matches_in_data(path, data, regex)
+        ]
+
+    @staticmethod
+    def _get_matches_in_data(path: Path, data: bytes, regex: Pattern[bytes]) -> List[Match]:
+        matches: List[ForbiddenPatterns.Match] = []
+
+        line_number = 1
+        line_start = 0
+
+        for found in regex.finditer(data):
+            start = found.start()
+            line_number += data.count(b"\n", line_start, start)
+            line_start = data.rfind(b"\n", 0, start) + 1
+            column_number = len(data[line_start:start].decode("utf-8", errors="replace")) + 1
+
+            matches.append(
+                ForbiddenPatterns.Match(
+                    path, line_number, column_number, found.group().decode()
+                )
+            )
+
+        return matches
+
+
+class CheckStatus(Enum):
+    OK = "ok"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    CANCELLED = "cancelled"
+
+
+class Runner:
+    """Runs the checks.
+
+    Checks are dispatched onto a pool of `jobs` workers as soon as all of
+    their prerequisites succeeded, but the results are still printed in the
+    order the checks were added. With `fail_fast`, the first failure cancels
+    the checks that are still queued or running.
+    """
+
+    @dataclass
+    class CheckItem:
+        check: Check
+        prerequisites: List[Check]
+
+    @dataclass
+    class CheckResult:
+        status: CheckStatus
+        remark: str
+        error: Optional[CheckError] = None
+        cached: bool = False
+        metrics: CheckMetrics = field(default_factory=CheckMetrics)
+
+    def __init__(
+        self,
+        to_skip: List[CheckID],
+        verbose: bool = False,
+        jobs: Optional[int] = None,
+        cache: Optional[ResultCache] = None,
+        changed_files: Optional[Set[Path]] = None,
+        fail_fast: bool = False,
+    ):
+        self._to_skip = to_skip
+        self._verbose = verbose
+        self._jobs = jobs if jobs is not None else os.cpu_count() or 1
+        self._cache = cache
+        self._changed_files = changed_files
+        self._fail_fast = fail_fast
+        self._cancellation = Cancellation()
+
+        self._check_items: List[Runner.CheckItem] = []
+        self._results: Dict[Check, Runner.CheckResult] = {}
+        self._metrics: Dict[Check, CheckMetrics] = {}
+        self._n_printed = 0
+        self._duration = 0.0
+
+    def add(self, check: Check, prerequisites: List[Check] = []) -> None:
+        if self._changed_files is not None:
+            check.restrict_to(self._changed_files)
+
+        check_item = Runner.CheckItem(check, prerequisites)
+        self._check_items.append(check_item)
+
+    def select(self, predicate: Callable[[Check], bool]) -> int:
+        """Only keeps the checks matching `predicate` and their prerequisites.
+
+        Returns the number of checks that are kept.
+        """
+
+        selected = {item.check for item in self._check_items if predicate(item.check)}
+
+        for item in reversed(self._check_items):
+            if item.check in selected:
+                selected.update(item.prerequisites)
+
+        self._check_items = [item for item in self._check_items if item.check in selected]
+
+        return len(self._check_items)
+
+    def run_all(self) -> bool:
+        """Returns true if there are no failed checks; skipped or successful checks will be allowed."""
+
+        n_checks = len(self._check_items)
+
+        print(f"{RUNNING} checks at {os.getcwd()}")
+        print("")
+        print(f"running {n_checks} checks")
+
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+            try:
+                self._run_graph(executor)
+            except KeyboardInterrupt:
+                # The subprocesses are in their own session, out of reach of Ctrl+C
+                self._cancellation.cancel()
+                raise
+
+        check_duration = time.perf_counter() - start_time
+        self._duration = check_duration
+        n_successful_checks = len(self._checks_with_status(CheckStatus.OK))
+        n_failed = len(self._checks_with_status(CheckStatus.FAILED))
+        n_skipped = len(self._checks_with_status(CheckStatus.SKIPPED))
+        n_cancelled = len(self._checks_with_status(CheckStatus.CANCELLED))
+
+        if n_failed > 0:
+            print("")
+            self._print_failures()
+
+        print("")
+        self._print_final_result(
+            n_checks, n_successful_checks, n_failed, n_skipped, n_cancelled, check_duration
+        )
+
+        return n_failed == 0
+
+    def print_profile(self) -> None:
+        """Prints the checks that ran, from the slowest to the fastest."""
+
+        ran_checks = sorted(
+            (item.check for item in self._check_items if item.check in self._metrics),
+            key=lambda check: self._metrics[check].wall_time,
+            reverse=True,
+        )
+
+        print("")
+        print("slowest checks:")
+
+        for check in ran_checks:
+            metrics = self._metrics[check]
+            print(
+                f"    {metrics.wall_time:6.2f}s wall {metrics.cpu_time:6.2f}s cpu {metrics.n_subprocesses:4} subprocesses {metrics.bytes_read / 1024:10.1f} KiB read  {check.subject()}"
+            )
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the results of the last run."""
+
+        return {
+            "success": len(self._checks_with_status(CheckStatus.FAILED)) == 0,
+            "duration": self._duration,
+            "checks": [self._result_to_dict(item.check) for item in self._check_items],
+        }
+
+    def json_report(self) -> str:
+        """Returns the results of the last run as JSON."""
+
+        return json.dumps(self.report(), indent=2)
+
+    def junit_report(self) -> str:
+        """Returns the results of the last run as JUnit XML."""
+
+        testsuite = ElementTree.Element(
+            "testsuite",
+            name="checks",
+            tests=str(len(self._check_items)),
+            failures=str(len(self._checks_with_status(CheckStatus.FAILED))),
+            skipped=str(
+                len(self._checks_with_status(CheckStatus.SKIPPED))
+                + len(self._checks_with_status(CheckStatus.CANCELLED))
+            ),
+            time=f"{self._duration:.3f}",
+        )
+
+        for item in self._check_items:
+            result = self._results[item.check]
+            testcase = ElementTree.SubElement(
+                testsuite,
+                "testcase",
+                classname="checks",
+                name=item.check.id().value,
+                time=f"{result.metrics.wall_time:.3f}",
+            )
+
+            if result.error is not None:
+                failure = ElementTree.SubElement(
+                    testcase, "failure", message=strip_ansi(result.error.suggestion())
+                )
+                failure.text = strip_ansi(result.error.message())
+            elif result.status in (CheckStatus.SKIPPED, CheckStatus.CANCELLED):
+                ElementTree.SubElement(testcase, "skipped", message=strip_ansi(result.remark))
+
+        testsuites = ElementTree.Element("testsuites")
+        testsuites.append(testsuite)
+
+        return ElementTree.tostring(testsuites, encoding="unicode")
+
+    def _result_to_dict(self, check: Check) -> Dict[str, Any]:
+        result = self._results[check]
+
+        return {
+            "id": check.id().value,
+            "subject": check.subject(),
+            "status": result.status.value,
+            "remark": strip_ansi(result.remark),
+            "cached": result.cached,
+            "wall_time": result.metrics.wall_time,
+            "cpu_time": result.metrics.cpu_time,
+            "subprocesses": result.metrics.n_subprocesses,
+            "bytes_read": result.metrics.bytes_read,
+            "message": strip_ansi(result.error.message()) if result.error else None,
+            "suggestion": strip_ansi(result.error.suggestion()) if result.error else None,
+        }
+
+    def _run_graph(self, executor: ThreadPoolExecutor) -> None:
+        pending = list(self._check_items)
+        running: Dict[Future[bool], Runner.CheckItem] = {}
+
+        while len(pending) > 0 or len(running) > 0:
+            pending = self._dispatch_ready(pending, running, executor)
+
+            if len(running) == 0:
+                # Nothing can make progress anymore, e.g. on a prerequisite cycle
+                for item in pending:
+                    self._record_incomplete_prerequisite(item)
+                pending = []
+            else:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    self._record_finished(running.pop(future), future)
+
+            self._print_ready_results()
+
+    def _dispatch_ready(
+        self,
+        pending: List[CheckItem],
+        running: Dict[Future[bool], CheckItem],
+        executor: ThreadPoolExecutor,
+    ) -> List[CheckItem]:
+        """Submits or skips the items whose prerequisites are settled and returns the rest."""
+
+        still_pending: List[Runner.CheckItem] = []
+        unsettled = {item.check for item in pending} | {
+            item.check for item in running.values()
+        }
+
+        for item in pending:
+            if item.check.id() in self._to_skip:
+                self._results[item.check] = Runner.CheckResult(
+                    CheckStatus.SKIPPED, f"{SKIPPED} (via command flag)"
+                )
+            elif any(prerequisite in unsettled for prerequisite in item.prerequisites):
+                still_pending.append(item)
+            elif not self._has_complete_prerequisite(item) and not self._has_cancelled_prerequisite(item):
+                self._record_incomplete_prerequisite(item)
+            elif self._cancellation.is_cancelled():
+                self._results[item.check] = Runner.CheckResult(CheckStatus.CANCELLED, CANCELLED)
+            else:
+                metrics = CheckMetrics()
+                self._metrics[item.check] = metrics
+                running[executor.submit(self._run_check, item.check, metrics)] = item
+
+            if item.check in self._results:
+                # So the items depending on it are settled in the same pass
+                unsettled.discard(item.check)
+
+        return still_pending
+
+    def _run_check(self, check: Check, metrics: CheckMetrics) -> bool:
+        current_metrics.set(metrics)
+        current_cancellation.set(self._cancellation)
+
+        if self._cancellation.is_cancelled():
+            # It was still queued when the run got cancelled
+            raise CheckCancelledError()
+
+        start_time = time.perf_counter()
+        start_cpu_time = time.thread_time()
+
+        try:
+            return self._run_check_or_use_cache(check)
+        finally:
+            metrics.wall_time = time.perf_counter() - start_time
+            metrics.add_cpu_time(time.thread_time() - start_cpu_time)
+
+    def _run_check_or_use_cache(self, check: Check) -> bool:
+        """Runs the check unless it is cached, and returns whether it was cached."""
+
+        key = self._cache.key(check) if self._cache is not None else None
+
+        if key is not None and self._cache is not None and self._cache.contains(key):
+            return True
+
+        check.run()
+
+        if key is not None and self._cache is not None:
+            self._cache.insert(key)
+
+        return False
+
+    def _record_finished(self, item: CheckItem, future: Future[bool]) -> None:
+        metrics = self._metrics[item.check]
+
+        try:
+            cached = future.result()
+        except CheckCancelledError:
+            self._results[item.check] = Runner.CheckResult(
+                CheckStatus.CANCELLED, CANCELLED, metrics=metrics
+            )
+        except CheckError as e:
+            self._results[item.check] = Runner.CheckResult(
+                CheckStatus.FAILED, FAILED, e, metrics=metrics
+            )
+
+            if self._fail_fast:
+                self._cancellation.cancel()
+        else:
+            remark = f"{OK} (cached)" if cached else OK
+            self._results[item.check] = Runner.CheckResult(
+                CheckStatus.OK, remark, cached=cached, metrics=metrics
+            )
+
+    def _record_incomplete_prerequisite(self, item: CheckItem) -> None:
+        prerequisites_to_print = [
+            prerequisite.subject()
+            for prerequisite in item.prerequisites
+            if not self._is_successful(prerequisite)
+        ]
+
+        requires_message = ", ".join(prerequisites_to_print)
+
+        self._results[item.check] = Runner.CheckResult(
+            CheckStatus.SKIPPED, f"{SKIPPED} (requires: {requires_message})"
+        )
+
+    def _has_complete_prerequisite(self, item: CheckItem) -> bool:
+        for prerequisite_check in item.prerequisites:
+            if not self._is_successful(prerequisite_check):
+                return False
+        return True
+
+    def _has_cancelled_prerequisite(self, item: CheckItem) -> bool:
+        return any(
+            self._results[prerequisite].status == CheckStatus.CANCELLED
+            for prerequisite in item.prerequisites
+            if prerequisite in self._results
+        )
+
+    def _is_successful(self, check: Check) -> bool:
+        result = self._results.get(check)
+        return result is not None and result.status == CheckStatus.OK
+
+    def _checks_with_status(self, status: CheckStatus) -> List[Check]:
+        return [
+            item.check
+            for item in self._check_items
+            if self._results[item.check].status == status
+        ]
+
+    def _print_ready_results(self) -> None:
+        """Prints the results that are available, keeping the order the checks were added."""
+
+        while self._n_printed < len(self._check_items):
+            check = self._check_items[self._n_printed].check
+            result = self._results.get(check)
+
+            if result is None:
+                break
+
+            self._print_result(check, result.remark)
+            self._n_printed += 1
+
+    def _print_failures(self) -> None:
+        print("failures:")
+        print("")
+
+        failed_checks = self._checks_with_status(CheckStatus.FAILED)
+
+        for check in failed_checks:
+            error = self._results[check].error
+            assert error is not None
+
+            message = error.message()
+            suggestion = error.suggestion()
+
+            if message is not None or suggestion is not None:
+                print(f"---- {check.subject()} ----")
+
+            if message is not None:
+                print(message)
+                print("")
+
+            if suggestion is not None:
+                print(suggestion)
+                print("")
+
+        print("")
+        print("failures:")
+
+        for check in failed_checks:
+            print(f"    {check.subject()}")
+
+    def _print_result(self, check: Check, remark: str) -> None:
+        messages = ["check", check.subject()]
+
+        version = check.version() if self._verbose else None
+        if version is not None:
+            messages.append(f"({version})")
+
+        messages.append("...")
+        messages.append(remark)
+
+        print(" ".join(messages))
+
+    @staticmethod
+    def _print_final_result(
+        total: int,
+        n_successful: int,
+        n_failed: int,
+        n_skipped: int,
+        n_cancelled: int,
+        duration: float,
+    ) -> None:
+        result = OK if n_failed == 0 else FAILED
+        cancelled = f"{n_cancelled} cancelled; " if n_cancelled > 0 else ""
+
+        print(
+            f"check result: {result}. {n_successful} passed; {n_failed} failed; {n_skipped} skipped; {cancelled}finished in {duration:.2f}s"
+        )
+
+
+class Watcher(ABC):
+    @abstractmethod
+    def wait_for_changes(self, debounce: float) -> Set[Path]:
+        """Blocks until files change and returns them, once none changed for `debounce` seconds."""
+
+        raise NotImplementedError
+
+
+class InotifyWatcher(Watcher):
+    """Watches directory trees for changed files with inotify.
+
+    Directories created within the trees are watched as they appear.
+    """
+
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_ISDIR = 0x40000000
+
+    EVENT_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, directories: List[Path]):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._directories = directories
+        self._watches: Dict[int, Path] = {}
+
+        for directory in directories:
+            self._watch_tree(directory)
+
+    def wait_for_changes(self, debounce: float) -> Set[Path]:
+        select.select([self._fd], [], [])
+        changes: Set[Path] = set()
+
+        while True:
+            changes |= self._read_events()
+
+            readable, _, _ = select.select([self._fd], [], [], debounce)
+            if not readable:
+                return changes
+
+    def _read_events(self) -> Set[Path]:
+        data = os.read(self._fd, 64 * 1024)
+        changes: Set[Path] = set()
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0").decode()
+            offset += name_length
+
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were lost, so consider everything changed
+                changes |= set(snapshot_files(self._directories))
+            elif wd in self._watches and name:
+                path = self._watches[wd] / name
+
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        changes |= self._watch_tree(path)
+                else:
+                    changes.add(path)
+
+        return changes
+
+    def _watch_tree(self, directory: Path) -> Set[Path]:
+        """Watches `directory` and its subdirectories, returning the files in them."""
+
+        files: Set[Path] = set()
+
+        for root, _, names in os.walk(directory):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), self.EVENT_MASK)
+
+            if wd >= 0:
+                self._watches[wd] = Path(root)
+
+            files.update(Path(root, name) for name in names)
+
+        return files
+
+
+class PollingWatcher(Watcher):
+    """Watches directory trees for changed files by comparing their modification times."""
+
+    def __init__(self, directories: List[Path], interval: float = 0.5):
+        self._directories = directories
+        self._interval = interval
+        self._snapshot = snapshot_files(directories)
+
+    def wait_for_changes(self, debounce: float) -> Set[Path]:
+        changes: Set[Path] = set()
+
+        while True:
+            time.sleep(debounce if changes else self._interval)
+
+            snapshot = snapshot_files(self._directories)
+            new_changes = {
+                path
+                for path in self._snapshot.keys() | snapshot.keys()
+                if self._snapshot.get(path) != snapshot.get(path)
+            }
+            self._snapshot = snapshot
+
+            if changes and not new_changes:
+                return changes
+
+            changes |= new_changes
+
+
+def create_watcher(directories: List[Path]) -> Watcher:
+    try:
+        return InotifyWatcher(directories)
+    except (OSError, AttributeError):
+        return PollingWatcher(directories)
+
+
+def snapshot_files(directories: List[Path]) -> Dict[Path, Tuple[int, int]]:
+    """Returns the modification time and size of the files in the directory trees."""
+
+    snapshot: Dict[Path, Tuple[int, int]] = {}
+
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = Path(root, name)
+
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+    return snapshot
+
+
+def is_watched(path: Path) -> bool:
+    """Whether `path` is one of the inputs of the checks that watch mode reacts to."""
+
+    if path.name.startswith(".") or path.name.endswith("~"):
+        # Hidden and backup files, like the ones editors save to
+        return False
+
+    return (
+        Path("src") in path.parents
+        or Path("data/resources/ui") in path.parents
+        or path in (Path("po/POTFILES.in"), Path("data/resources/resources.gresource.xml"))
+    )
+
+
+def watch(args: Namespace, debounce: float = 0.2) -> int:
+    """Runs the checks, then runs again the ones affected by each batch of changed files."""
+
+    # The parent directories, so that files replaced by editors are still seen
+    directories = [
+        Path(directory)
+        for directory in ("src", "po", "data/resources")
+        if os.path.isdir(directory)
+    ]
+
+    watcher = create_watcher(directories)
+    # Kept warm between the runs, like the server does
+    state = SharedState.create(use_cache=not args.no_cache)
 
-        return ["dbg!", "println!", "print!", "todo!", *gettext_macro_patterns]
+    try:
+        create_runner(args, state=state).run_all()
 
-    @staticmethod
-    def _get_matches(patterns: List[str]) -> List[Match]:
-        to_find = "|".join(patterns)
+        while True:
+            print("")
+            print(f"{RUNNING} watching for changes, press Ctrl+C to stop")
 
-        output = get_output(
-            [
-                "find",
-                "src",
-                "-type",
-                "f",
-                "-exec",
-                "awk",
-                f"match($0, /{to_find}/, p) {{ print FILENAME, FNR, index($0, p[0]), p[0] }}",
-                "{}",
-                ";",
-            ]
-        )
+            changes = {path for path in watcher.wait_for_changes(debounce) if is_watched(path)}
+            if len(changes) > 0:
+                run_affected(args, state, changes)
+    except KeyboardInterrupt:
+        return os.EX_OK
 
-        matches: List[ForbiddenPatterns.Match] = []
 
-        for line in output.splitlines():
-            path, line_number, column_number, pattern = line.split()
-            matches.append(
-                ForbiddenPatterns.Match(
-                    Path(path), int(line_number), int(column_number), pattern
-                )
-            )
+def run_affected(args: Namespace, state: SharedState, changes: Set[Path]) -> None:
+    state.invalidate(changes)
 
-        return matches
+    runner = create_runner(args, changed_files=changes, state=state)
+    n_checks = runner.select(
+        lambda check: any(check.is_affected_by(path) for path in changes)
+    )
 
+    print("")
+    print(f"{RUNNING} changed: {', '.join(str(path) for path in sorted(changes))}")
 
-class Runner:
-    """Runs the checks."""
+    if n_checks > 0:
+        runner.run_all()
 
-    @dataclass
-    class CheckItem:
-        check: Check
-        prerequisites: List[Check]
 
-    def __init__(
-        self,
-        to_skip: List[CheckID],
-        verbose: bool = False,
-    ):
-        self._to_skip = to_skip
-        self._verbose = verbose
+class ServerError(Exception):
+    pass
 
-        self._check_items: List[Runner.CheckItem] = []
-        self._successful_checks: List[Check] = []
-        self._failed_checks: List[Tuple[Check, CheckError]] = []
 
-    def add(self, check: Check, prerequisites: List[Check] = []) -> None:
-        check_item = Runner.CheckItem(check, prerequisites)
-        self._check_items.append(check_item)
+class CheckServer:
+    """Serves the checks over a Unix socket, with a JSON-RPC 2.0 request or response per line.
 
-    def run_all(self) -> bool:
-        """Returns true if there are no failed checks; skipped or successful checks will be allowed."""
+    The state shared by the checks is kept warm between requests, and
+    updated as the watched files change. The methods are:
+        - `run`, with the optional `checks`, `files` and `skip` lists,
+          returns the report of the run with its text output as `log`
+        - `invalidate`, with a `files` list, updates the state for files
+          changed outside of the watched directories
+        - `shutdown` stops the server
+    """
 
-        n_checks = len(self._check_items)
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            assert isinstance(self.server, CheckServer.SocketServer)
 
-        print(f"{RUNNING} checks at {os.getcwd()}")
-        print("")
-        print(f"running {n_checks} checks")
+            for line in self.rfile:
+                response = self.server.check_server.handle_request(line)
+                self.wfile.write(json.dumps(response).encode() + b"\n")
 
-        n_skipped = 0
-        start_time = time.time()
+                if self.server.check_server.shutdown_requested:
+                    # Only once the response is sent, and from another thread
+                    # as serve_forever waits for the handlers to return
+                    threading.Thread(target=self.server.shutdown).start()
+                    return
 
-        for item in self._check_items:
-            if item.check.id() in self._to_skip:
-                n_skipped += 1
-                self._print_result(item.check, f"{SKIPPED} (via command flag)")
-                continue
+    class SocketServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        check_server: CheckServer
 
-            if not self._has_complete_prerequisite(item):
-                n_skipped += 1
-                self._print_has_incomplete_prerequisite(item)
-                continue
+    def __init__(self, args: Namespace, socket_path: Path):
+        self._args = args
+        self._socket_path = socket_path
+        self._state = SharedState.create(use_cache=not args.no_cache)
+        self._lock = threading.Lock()
+        self.shutdown_requested = False
+
+    def serve(self) -> int:
+        ensure_cache_directory(self._socket_path.parent)
+        self._socket_path.unlink(missing_ok=True)
+
+        with CheckServer.SocketServer(str(self._socket_path), CheckServer.RequestHandler) as server:
+            server.check_server = self
+
+            threading.Thread(target=self._invalidate_on_changes, daemon=True).start()
+            print(f"{RUNNING} checks server at {self._socket_path}, press Ctrl+C to stop")
 
             try:
-                item.check.run()
-            except CheckError as e:
-                self._failed_checks.append((item.check, e))
-                self._print_result(item.check, FAILED)
-            else:
-                self._successful_checks.append(item.check)
-                self._print_result(item.check, OK)
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self._socket_path.unlink(missing_ok=True)
 
-        check_duration = time.time() - start_time
-        n_successful_checks = len(self._successful_checks)
-        n_failed = len(self._failed_checks)
+        return os.EX_OK
 
-        if n_failed > 0:
-            print("")
-            self._print_failures()
+    def handle_request(self, line: bytes) -> Dict[str, Any]:
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            return json_rpc_error(None, -32700, f"Parse error: {error}")
 
-        print("")
-        self._print_final_result(
-            n_checks, n_successful_checks, n_failed, n_skipped, check_duration
+        if not isinstance(request, dict):
+            return json_rpc_error(None, -32600, "Invalid request: not an object")
+
+        method = request.get("method")
+        params = request.get("params") or {}
+
+        if not isinstance(method, str):
+            return json_rpc_error(request.get("id"), -32600, "Invalid request: needs a `method` string")
+
+        if not isinstance(params, dict):
+            return json_rpc_error(request.get("id"), -32602, "Invalid params: must be an object")
+
+        handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "run": self._run,
+            "invalidate": self._invalidate,
+            "shutdown": self._shutdown,
+        }
+
+        if method not in handlers:
+            return json_rpc_error(request.get("id"), -32601, f"Unknown method `{method}`")
+
+        try:
+            result = handlers[method](params)
+        except (ValueError, TypeError) as error:
+            return json_rpc_error(request.get("id"), -32602, f"Invalid params: {error}")
+        except Exception as error:
+            # e.g. a missing POTFILES, which the checks don't report as a failure
+            return json_rpc_error(request.get("id"), -32603, f"Internal error: {error!r}")
+
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def _run(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        checks, files, skip = params.get("checks"), params.get("files"), params.get("skip", [])
+        args = Namespace(
+            **{
+                **vars(self._args),
+                "only": [CheckID(check) for check in checks] if checks is not None else None,
+                "skip": [CheckID(check) for check in skip],
+                "changed_since": None,
+                "staged": False,
+                "files": None,
+            }
         )
+        changed_files = {Path(file) for file in files} if files is not None else None
+        log = io.StringIO()
 
-        return n_failed == 0
+        with self._lock:
+            if changed_files is not None:
+                # The client may have changed them just before the watcher noticed
+                self._state.invalidate(changed_files)
 
-    def _has_complete_prerequisite(self, item: CheckItem) -> bool:
-        for prerequisite_check in item.prerequisites:
-            if prerequisite_check not in self._successful_checks:
-                return False
-        return True
+            runner = create_runner(args, changed_files=changed_files, state=self._state)
 
-    def _print_has_incomplete_prerequisite(self, item: CheckItem) -> None:
-        prerequisites_to_print = [
-            prerequisite.subject()
-            for prerequisite in item.prerequisites
-            if prerequisite not in self._successful_checks
+            with redirect_stdout(log):
+                runner.run_all()
+
+        return {**runner.report(), "log": log.getvalue()}
+
+    def _invalidate(self, params: Dict[str, Any]) -> None:
+        with self._lock:
+            self._state.invalidate({Path(file) for file in params["files"]})
+
+    def _shutdown(self, params: Dict[str, Any]) -> None:
+        self.shutdown_requested = True
+
+    def _invalidate_on_changes(self) -> None:
+        directories = [
+            Path(directory)
+            for directory in ("src", "po", "data/resources")
+            if os.path.isdir(directory)
         ]
+        watcher = create_watcher(directories)
 
-        requires_message = ", ".join(prerequisites_to_print)
+        while True:
+            changes = watcher.wait_for_changes(debounce=0.05)
 
-        self._print_result(
-            item.check,
-            f"{SKIPPED} (requires: {requires_message})",
-        )
+            with self._lock:
+                self._state.invalidate(changes)
 
-    def _print_failures(self) -> None:
-        print("failures:")
-        print("")
 
-        for (check, error) in self._failed_checks:
-            message = error.message()
-            suggestion = error.suggestion()
+def json_rpc_error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
 
-            if message is not None or suggestion is not None:
-                print(f"---- {check.subject()} ----")
 
-            if message is not None:
-                print(message)
-                print("")
+def call_server(socket_path: Path, method: str, params: Dict[str, Any]) -> Any:
+    """Calls `method` on the server listening at `socket_path` and returns its result."""
 
-            if suggestion is not None:
-                print(suggestion)
-                print("")
+    request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
 
-        print("")
-        print("failures:")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(socket_path))
+        connection.sendall(json.dumps(request).encode() + b"\n")
 
-        for (check, _) in self._failed_checks:
-            print(f"    {check.subject()}")
+        with connection.makefile("rb") as response_file:
+            line = response_file.readline()
 
-    def _print_result(self, check: Check, remark: str) -> None:
-        messages = ["check", check.subject()]
+    if not line:
+        raise ServerError("The server closed the connection without a reply")
 
-        version = check.version() if self._verbose else None
-        if version is not None:
-            messages.append(f"({version})")
+    try:
+        response = json.loads(line)
+    except ValueError as error:
+        raise ServerError(f"Invalid reply: {error}")
 
-        messages.append("...")
-        messages.append(remark)
+    if "error" in response:
+        raise ServerError(response["error"]["message"])
 
-        print(" ".join(messages))
+    return response["result"]
 
-    @staticmethod
-    def _print_final_result(
-        total: int, n_successful: int, n_failed: int, n_skipped: int, duration: float
-    ) -> None:
-        result = OK if n_failed == 0 else FAILED
 
-        print(
-            f"check result: {result}. {n_successful} passed; {n_failed} failed; {n_skipped} skipped; finished in {duration:.2f}s"
-        )
+def run_client(args: Namespace) -> int:
+    """Runs the checks on the server, which must have been started with `serve`."""
+
+    changed_files = get_changed_files(args.changed_since, args.staged, args.files)
+    params = {
+        "checks": [check.value for check in args.only] if args.only else None,
+        "files": sorted(str(file) for file in changed_files) if changed_files is not None else None,
+        "skip": [check.value for check in args.skip],
+    }
+
+    try:
+        report = call_server(args.socket, "run", params)
+    except (OSError, ServerError) as error:
+        print(f"{ERROR}: Failed to run the checks on the server at {args.socket}: {error}", file=sys.stderr)
+        return 1
+
+    if args.format == "json":
+        print(report.pop("log"), end="", file=sys.stderr)
+        print(json.dumps(report, indent=2))
+    else:
+        print(report["log"], end="")
+
+    return os.EX_OK if report["success"] else 1
+
+
+def run_process(args: List[str]) -> Tuple[int, bytes, bytes]:
+    """Runs the process and returns its return code, stdout and stderr.
+
+    The resources used by the process are added to the metrics of the current check,
+    and it is terminated if the run of the current check is cancelled.
+    """
+
+    cancellation = current_cancellation.get()
+
+    if cancellation is not None and cancellation.is_cancelled():
+        raise CheckCancelledError()
+
+    with tempfile.TemporaryFile() as stderr_file:
+        with subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            start_new_session=cancellation is not None,
+        ) as process:
+            if cancellation is not None:
+                cancellation.register(process.pid)
+
+            assert process.stdout is not None
+            stdout = process.stdout.read()
+
+            if cancellation is not None:
+                os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+                cancellation.unregister(process.pid)
+
+            # Reap the process ourselves to get its resource usage
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+
+    if cancellation is not None and cancellation.is_cancelled():
+        raise CheckCancelledError()
+
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.add_subprocess(rusage.ru_utime + rusage.ru_stime, len(stdout) + len(stderr))
+
+    return (process.returncode, stdout, stderr)
 
 
 def run_and_get_output(args: List[str]) -> Tuple[int, str]:
-    process = subprocess.run(args, capture_output=True)
-    stdout = process.stdout.decode("utf-8").strip()
-    stderr = process.stderr.decode("utf-8").strip()
-    return (process.returncode, "\n".join([stdout, stderr]).strip())
+    return_code, stdout_bytes, stderr_bytes = run_process(args)
+    stdout = stdout_bytes.decode("utf-8").strip()
+    stderr = stderr_bytes.decode("utf-8").strip()
+    return (return_code, "\n".join([stdout, stderr]).strip())
 
 
 def get_output(args: List[str]) -> str:
-    process = subprocess.run(args, capture_output=True, check=True)
-    return process.stdout.decode("utf-8").strip()
+    return_code, stdout, stderr = run_process(args)
 
+    if return_code != 0:
+        raise subprocess.CalledProcessError(return_code, args, stdout, stderr)
+
+    return stdout.decode("utf-8").strip()
+
+
+def read_file(path: Path) -> bytes:
+    """Reads the file, adding the bytes read to the metrics of the current check."""
+
+    data = path.read_bytes()
+
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.add_bytes_read(len(data))
+
+    return data
+
+
+def run_concurrently(function: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """Calls `function` on each item on a thread pool, within the context of the caller.
+
+    This way the work is still accounted to the metrics of the current check.
+    """
+
+    def run_item(context_item: Tuple[Context, T]) -> R:
+        context, item = context_item
+        start_cpu_time = time.thread_time()
+
+        try:
+            return context.run(function, item)
+        finally:
+            metrics = context.get(current_metrics)
+            if metrics is not None:
+                metrics.add_cpu_time(time.thread_time() - start_cpu_time)
+
+    with ThreadPoolExecutor() as executor:
+        return list(executor.map(run_item, [(copy_context(), item) for item in items]))
+
+
+def strip_ansi(text: str) -> str:
+    return re.sub(r"\x1b(\[[0-9;]*[A-Za-z]|\(B)", "", text)
+
+
+def get_changed_files(
+    since: Optional[str], staged: bool, files: Optional[List[Path]] = None
+) -> Optional[Set[Path]]:
+    """Returns the files changed since the `since` revision, staged for commit or the given `files`.
+
+    This returns None if none is requested, meaning the whole project must be checked.
+    """
+
+    if files is not None:
+        return {Path(os.path.normpath(file)) for file in files}
+
+    diff_args = ["git", "diff", "--name-only", "--relative", "--diff-filter=d"]
+
+    if staged:
+        output = get_output([*diff_args, "--cached"])
+    elif since is not None:
+        output = "\n".join(
+            [
+                get_output([*diff_args, since]),
+                get_output(["git", "ls-files", "--others", "--exclude-standard"]),
+            ]
+        )
+    else:
+        return None
+
+    return {Path(line) for line in output.splitlines() if line}
+
+
+def get_rustfmt_edition_args() -> List[str]:
+    """Returns the arguments to make rustfmt use the edition from Cargo.toml, if any."""
+
+    try:
+        with open("Cargo.toml") as cargo_toml_file:
+            match = re.search(r'^edition\s*=\s*"(\d+)"', cargo_toml_file.read(), re.MULTILINE)
+    except FileNotFoundError:
+        return []
+
+    return ["--edition", match.group(1)] if match else []
+
+
+def get_rustup_stamp() -> str:
+    """Returns a stamp of the rustup toolchains, which change behind the proxies in ~/.cargo/bin."""
+
+    rustup_home = Path(os.environ.get("RUSTUP_HOME", "~/.rustup")).expanduser()
+    paths = [
+        rustup_home / "settings.toml",
+        rustup_home / "toolchains",
+        rustup_home / "update-hashes",
+        Path("rust-toolchain"),
+        Path("rust-toolchain.toml"),
+    ]
+    stamps = [os.environ.get("RUSTUP_TOOLCHAIN", "")]
+
+    for path in paths:
+        try:
+            stamps.append(f"{path}:{path.stat().st_mtime_ns}")
+        except FileNotFoundError:
+            continue
+
+    return ";".join(stamps)
+
+
+def ensure_cache_directory(directory: Path) -> None:
+    """Creates `directory`, which must be within CACHE_DIRECTORY, and makes git ignore the cache."""
+
+    directory.mkdir(parents=True, exist_ok=True)
+
+    gitignore = CACHE_DIRECTORY / ".gitignore"
+    if not gitignore.exists():
+        gitignore.write_text("*\n")
+
+
+@functools.lru_cache(maxsize=None)
+def get_checks_digest() -> bytes:
+    """Returns the hash of this script, as the checks without a version change along with it."""
+
+    return hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+
+def write_cache_file(path: Path, data: Any) -> None:
+    """Atomically writes `data` as JSON to `path`, which must be within CACHE_DIRECTORY.
+
+    The temporary file is unique, so concurrent runs don't replace each other's.
+    """
+
+    ensure_cache_directory(path.parent)
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+
+@functools.lru_cache(maxsize=None)
+def get_project_files() -> Optional[List[Path]]:
+    """Returns the files of the project that are not ignored by git, if it is a git repository."""
+
+    try:
+        output = get_output(
+            ["git", "ls-files", "--cached", "--others", "--exclude-standard"]
+        )
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None
+
+    return [Path(line) for line in output.splitlines()]
+
+
+def create_runner(
+    args: Optional[Namespace],
+    changed_files: Optional[Set[Path]] = None,
+    state: Optional[SharedState] = None,
+) -> Runner:
+    """Creates the runner of the checks selected by `args`.
+
+    The checks are restricted to `changed_files` if given, or else to the
+    files selected by `args`. They share `state` if given, or else a new one.
+    """
+
+    use_cache = not args.no_cache if args else True
+    state = state or SharedState.create(use_cache)
+    source_index = state.source_index
+
+    # The versions are part of the cache keys and shown when verbose
+    if use_cache or (args and args.verbose):
+        state.tools.probe_versions()
+
+    if changed_files is None and args:
+        changed_files = get_changed_files(args.changed_since, args.staged, args.files)
 
-def main(args: Optional[Namespace]) -> int:
     runner = Runner(
-        to_skip=args.skip if args else [], verbose=args.verbose if args else False
+        to_skip=args.skip if args else [],
+        verbose=args.verbose if args else False,
+        jobs=args.jobs if args else None,
+        cache=state.result_cache,
+        changed_files=changed_files,
+        fail_fast=args.fail_fast if args else False,
+    )
+    runner.add(
+        Rustfmt(
+            parallel=args.parallel_rustfmt if args else False,
+            cache_path=CACHE_DIRECTORY / "rustfmt.json" if use_cache else None,
+            tools=state.tools,
+        )
     )
-    runner.add(Rustfmt())
-    runner.add(Typos())
+    runner.add(Typos(state.tools))
 
-    potfiles_exist = PotfilesExist()
-    potfiles_sanity = PotfilesSanity()
+    potfiles = state.potfiles
+    potfiles_exist = PotfilesExist(potfiles)
+    potfiles_sanity = PotfilesSanity(source_index, potfiles)
     runner.add(potfiles_exist)
     runner.add(potfiles_sanity, prerequisites=[potfiles_exist])
     runner.add(
-        PotfilesAlphabetically(),
+        PotfilesAlphabetically(potfiles),
         prerequisites=[potfiles_exist, potfiles_sanity],
     )
 
-    runner.add(UiFiles())
+    runner.add(
+        UiFiles(
+            source_index,
+            cache_path=CACHE_DIRECTORY / "ui_files.json" if use_cache else None,
+            tools=state.tools,
+        )
+    )
     runner.add(Resources())
-    runner.add(ForbiddenPatterns())
+    runner.add(ForbiddenPatterns(source_index))
+
+    if args and args.only:
+        runner.select(lambda check: check.id() in args.only)
+
+    return runner
+
+
+def main(args: Optional[Namespace]) -> int:
+    if args and args.command == "serve":
+        return CheckServer(args, args.socket).serve()
+
+    if args and args.command == "client":
+        return run_client(args)
+
+    if args and args.watch:
+        return watch(args)
+
+    runner = create_runner(args)
+    output_format = args.format if args else "text"
+
+    if output_format == "text":
+        success = runner.run_all()
+    else:
+        # Keep stdout for the report
+        with redirect_stdout(sys.stderr):
+            success = runner.run_all()
+
+    if args and args.profile:
+        with redirect_stdout(sys.stdout if output_format == "text" else sys.stderr):
+            runner.print_profile()
+
+    if output_format == "json":
+        print(runner.json_report())
+    elif output_format == "junit":
+        print(runner.junit_report())
 
-    if runner.run_all():
+    if success:
         return os.EX_OK
     else:
         return 1
 
 
-def parse_args() -> Namespace:
+def positive_int(value: str) -> int:
+    number = int(value)
+
+    if number <= 0:
+        raise ArgumentTypeError(f"must be greater than 0, got {number}")
+
+    return number
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Namespace:
     from argparse import ArgumentParser
 
     parser = ArgumentParser(
         description="Run conformity checks on the current Rust project"
     )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["run", "serve", "client"],
+        default="run",
+        help="Run the checks, serve them with warm caches over a Unix socket, or run them on the server",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Use verbose output"
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=None,
+        help="Number of checks to run in parallel. Defaults to the number of cores",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "json", "junit"],
+        default="text",
+        help="Format of the report printed to stdout. The progress is printed to stderr for the non-text formats",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time and resources used by each check, from the slowest",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Cancel the remaining checks and terminate their processes once one fails",
+    )
+    parser.add_argument(
+        "--parallel-rustfmt",
+        action="store_true",
+        help="Check the code style by running rustfmt on the Rust files across the cores, instead of cargo fmt",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run every check even if its inputs did not change since it last succeeded",
+    )
+    changes_group = parser.add_mutually_exclusive_group()
+    changes_group.add_argument(
+        "--changed-since",
+        metavar="REF",
+        help="Only check the files that changed since the given git revision",
+    )
+    changes_group.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only check the files staged for commit",
+    )
+    changes_group.add_argument(
+        "--files",
+        nargs="+",
+        type=Path,
+        help="Only check the given files",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        type=CheckID,
+        help="Only run the given checks and their prerequisites",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=CACHE_DIRECTORY / "server.sock",
+        help="The Unix socket of the checks server",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="Keep running, and run again the checks affected by each change in src, po/POTFILES.in and data/resources",
+    )
     parser.add_argument(
         "-s",
         "--skip",
@@ -738,7 +2648,12 @@ def parse_args() -> Namespace:
         help=f"Checks to skip. It can be any of the following: {', '.join([check_id.value for check_id in CheckID])}",
     )
 
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.command == "client" and args.format == "junit":
+        parser.error("the client only supports the text and json formats")
+
+    return args
 
 
 if __name__ == "__main__":
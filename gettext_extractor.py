@@ -0,0 +1,720 @@
+import hashlib
+import json
+import re
+import subprocess
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from xml.parsers import expat
+
+import utils
+
+# Bump whenever the extracted messages change, so the cached ones are not reused
+EXTRACTOR_VERSION = 2
+
+# Index of the context, index of the msgid and index of the plural arguments
+KeywordSpec = Tuple[Optional[int], int, Optional[int]]
+
+RUST_KEYWORDS: Dict[str, KeywordSpec] = {
+    "gettext": (None, 0, None),
+    "gettext_f": (None, 0, None),
+    "ngettext": (None, 0, 1),
+    "ngettext_f": (None, 0, 1),
+    "pgettext": (0, 1, None),
+    "npgettext": (0, 1, 2),
+    "dgettext": (None, 1, None),
+    "dngettext": (None, 1, 2),
+    "dcgettext": (None, 1, None),
+    "dcngettext": (None, 1, 2),
+}
+
+RUST_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<raw_string>b?r(?P<hashes>\#*)".*?"(?P=hashes))
+    |(?P<string>b?"(?:[^"\\]|\\.)*")
+    |(?P<char>'(?:[^'\\\n]|\\u\{[0-9a-fA-F]+\}|\\.)')
+    |(?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<punct>\S)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+RUST_ESCAPE_REGEX = re.compile(
+    r"\\(x[0-9a-fA-F]{2}|u\{[0-9a-fA-F]+\}|\n\s*|.)", re.DOTALL
+)
+
+RUST_SIMPLE_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "0": "\0", "\\": "\\", "'": "'", '"': '"'}
+
+PO_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\t": "\\t", "\r": "\\r"}
+
+PO_UNESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"'}
+
+UI_TRANSLATABLE_VALUES = ("yes", "true", "1")
+
+DEFAULT_XGETTEXT_ARGS = ["--from-code=UTF-8", "--add-comments"]
+
+
+class ExtractionError(Exception):
+    """Raised when some files could not be parsed, with the error of each."""
+
+    def __init__(self, errors: Dict[str, str]):
+        super().__init__(", ".join(f"{file}: {error}" for file, error in errors.items()))
+        self.errors = errors
+
+
+@dataclass
+class Message:
+    msgid: str
+    msgctxt: Optional[str] = None
+    msgid_plural: Optional[str] = None
+    references: List[Tuple[str, int]] = field(default_factory=list)
+    comments: List[str] = field(default_factory=list)
+    flags: List[str] = field(default_factory=list)
+
+    def key(self) -> Tuple[Optional[str], str]:
+        return (self.msgctxt, self.msgid)
+
+
+@dataclass
+class Token:
+    kind: str
+    text: str
+    line: int
+
+
+def parse_keyword_args(args: List[str]) -> Dict[str, KeywordSpec]:
+    """Returns the Rust keywords with the ones of the `--keyword` arguments of xgettext.
+
+    A bare `--keyword` drops the default keywords, like it does for xgettext.
+    Total argument counts and automatic comments in the specs are ignored.
+    """
+
+    keywords = dict(RUST_KEYWORDS)
+
+    for arg in args:
+        if arg in ("--keyword", "-k"):
+            keywords.clear()
+            continue
+
+        if arg.startswith("--keyword="):
+            value = arg[len("--keyword="):]
+        elif arg.startswith("-k"):
+            value = arg[len("-k"):]
+        else:
+            continue
+
+        name, _, spec = value.partition(":")
+        context_index: Optional[int] = None
+        indexes: List[int] = []
+
+        for part in spec.split(",") if spec else []:
+            part = part.strip()
+
+            if part.endswith("c") and part[:-1].isdigit():
+                context_index = int(part[:-1]) - 1
+            elif part.isdigit():
+                indexes.append(int(part) - 1)
+
+        keywords[name] = (
+            context_index,
+            indexes[0] if len(indexes) > 0 else 0,
+            indexes[1] if len(indexes) > 1 else None,
+        )
+
+    return keywords
+
+
+def tokenize_rust(source: str) -> List[Token]:
+    tokens: List[Token] = []
+    line = 1
+    position = 0
+
+    for match in RUST_TOKEN_REGEX.finditer(source):
+        line += source.count("\n", position, match.start())
+        position = match.start()
+
+        kind = match.lastgroup
+
+        if kind is not None:
+            tokens.append(Token(kind, match.group(), line))
+
+    return tokens
+
+
+def comment_lines(comment: str) -> List[str]:
+    if comment.startswith("//"):
+        body = comment[2:]
+    else:
+        body = comment[2:-2]
+
+    return [line.strip() for line in body.splitlines() if line.strip()]
+
+
+def preceding_comments(tokens: List[Token], index: int) -> List[str]:
+    """Returns the comments right before the line of the token at `index`, like xgettext.
+
+    Only the code on the line of the token may separate it from the comments.
+    """
+
+    line = tokens[index].line
+    start = index
+
+    while start > 0 and tokens[start - 1].kind != "comment" and tokens[start - 1].line == line:
+        start -= 1
+
+    end = start
+    while start > 0 and tokens[start - 1].kind == "comment":
+        start -= 1
+
+    return [text for token in tokens[start:end] for text in comment_lines(token.text)]
+
+
+def unescape_rust_string(literal: str) -> Optional[str]:
+    """Returns the value of a Rust string literal, or None for byte strings."""
+
+    if literal.startswith("b"):
+        return None
+
+    if literal.startswith("r"):
+        body = literal[1:]
+        n_hashes = len(body) - len(body.lstrip("#"))
+        return body[n_hashes + 1:len(body) - n_hashes - 1]
+
+    def unescape(match: "re.Match[str]") -> str:
+        escape = match.group(1)
+
+        if escape.startswith("x"):
+            return chr(int(escape[1:], 16))
+        if escape.startswith("u{"):
+            return chr(int(escape[2:-1], 16))
+        if escape.startswith("\n"):
+            return ""
+
+        return RUST_SIMPLE_ESCAPES.get(escape, "\\" + escape)
+
+    return RUST_ESCAPE_REGEX.sub(unescape, literal[1:-1])
+
+
+def split_rust_arguments(tokens: List[Token], start: int) -> List[List[Token]]:
+    """Returns the top level arguments of the call whose `(` is at `start`."""
+
+    arguments: List[List[Token]] = [[]]
+    depth = 0
+
+    for token in tokens[start:]:
+        if token.kind == "punct" and token.text in "([{":
+            depth += 1
+            if depth == 1:
+                continue
+        elif token.kind == "punct" and token.text in ")]}":
+            depth -= 1
+            if depth == 0:
+                break
+        elif depth == 1 and token.kind == "punct" and token.text == ",":
+            arguments.append([])
+            continue
+
+        arguments[-1].append(token)
+
+    return arguments
+
+
+def string_argument(arguments: List[List[Token]], index: Optional[int]) -> Optional[str]:
+    if index is None or index >= len(arguments):
+        return None
+
+    argument = arguments[index]
+
+    if len(argument) != 1 or argument[0].kind not in ("string", "raw_string"):
+        return None
+
+    return unescape_rust_string(argument[0].text)
+
+
+def extract_rust_messages(
+    source: str, reference: str, keywords: Dict[str, KeywordSpec] = RUST_KEYWORDS
+) -> List[Message]:
+    messages: List[Message] = []
+
+    # Most files don't have translatable strings, so avoid tokenizing them
+    if not any(keyword in source for keyword in keywords):
+        return messages
+
+    all_tokens = tokenize_rust(source)
+    tokens = [token for token in all_tokens if token.kind != "comment"]
+    # Index of each code token within all the tokens, to find its comments
+    positions = [index for index, token in enumerate(all_tokens) if token.kind != "comment"]
+
+    for index, token in enumerate(tokens):
+        if token.kind != "ident" or token.text not in keywords:
+            continue
+
+        # Skip the `!` of macros
+        start = index + 1
+        if start < len(tokens) and tokens[start].text == "!":
+            start += 1
+
+        if start >= len(tokens) or tokens[start].text != "(":
+            continue
+
+        context_index, msgid_index, plural_index = keywords[token.text]
+        arguments = split_rust_arguments(tokens, start)
+        msgid = string_argument(arguments, msgid_index)
+
+        if not msgid:
+            continue
+
+        messages.append(
+            Message(
+                msgid,
+                msgctxt=string_argument(arguments, context_index),
+                msgid_plural=string_argument(arguments, plural_index),
+                references=[(reference, token.line)],
+                comments=preceding_comments(all_tokens, positions[index]),
+            )
+        )
+
+    return messages
+
+
+class UiMessageParser:
+    """Collects the strings marked as translatable in a GtkBuilder ui file."""
+
+    def __init__(self, reference: str):
+        self.messages: List[Message] = []
+
+        self._reference = reference
+        self._parser = expat.ParserCreate()
+        self._parser.StartElementHandler = self._on_start_element
+        self._parser.EndElementHandler = self._on_end_element
+        self._parser.CharacterDataHandler = self._on_character_data
+
+        # Attributes, line and text of the open elements; None if not translatable
+        self._stack: List[Optional[Tuple[Dict[str, str], int, List[str]]]] = []
+
+    def parse(self, data: bytes) -> List[Message]:
+        self._parser.Parse(data, True)
+        return self.messages
+
+    def _on_start_element(self, name: str, attributes: Dict[str, str]) -> None:
+        if attributes.get("translatable") in UI_TRANSLATABLE_VALUES:
+            self._stack.append((attributes, self._parser.CurrentLineNumber, []))
+        else:
+            self._stack.append(None)
+
+    def _on_character_data(self, data: str) -> None:
+        if len(self._stack) > 0 and self._stack[-1] is not None:
+            self._stack[-1][2].append(data)
+
+    def _on_end_element(self, name: str) -> None:
+        element = self._stack.pop()
+
+        if element is None:
+            return
+
+        attributes, line, text = element
+        msgid = "".join(text)
+
+        if not msgid:
+            return
+
+        comment = attributes.get("comments")
+        self.messages.append(
+            Message(
+                msgid,
+                msgctxt=attributes.get("context"),
+                references=[(self._reference, line)],
+                comments=[comment] if comment else [],
+            )
+        )
+
+
+def extract_ui_messages(data: bytes, reference: str) -> List[Message]:
+    return UiMessageParser(reference).parse(data)
+
+
+def unescape_po_string(quoted: str) -> str:
+    return re.sub(
+        r"\\(.)", lambda match: PO_UNESCAPES.get(match.group(1), match.group(0)), quoted[1:-1]
+    )
+
+
+def parse_po_messages(content: str) -> List[Message]:
+    """Parses the messages of a po or pot file, skipping its header."""
+
+    messages: List[Message] = []
+    fields: Dict[str, str] = {}
+    comments: List[Tuple[str, str]] = []
+    current_field: Optional[str] = None
+
+    def finish_entry() -> None:
+        if "msgid" in fields and fields["msgid"]:
+            messages.append(create_po_message(fields, comments))
+        fields.clear()
+        comments.clear()
+
+    for line in content.splitlines() + [""]:
+        line = line.strip()
+
+        if not line:
+            finish_entry()
+            current_field = None
+        elif line.startswith("#"):
+            if current_field is not None:
+                finish_entry()
+                current_field = None
+            comments.append((line[:2], line[2:].strip()))
+        elif line.startswith('"') and current_field is not None:
+            fields[current_field] += unescape_po_string(line)
+        else:
+            current_field, _, value = line.partition(" ")
+            fields[current_field] = unescape_po_string(value)
+
+    return messages
+
+
+def create_po_message(fields: Dict[str, str], comments: List[Tuple[str, str]]) -> Message:
+    message = Message(
+        fields["msgid"],
+        msgctxt=fields.get("msgctxt"),
+        msgid_plural=fields.get("msgid_plural"),
+    )
+
+    for kind, text in comments:
+        if kind == "#:":
+            for reference in text.split():
+                path, _, line = reference.rpartition(":")
+                message.references.append((path, int(line)) if line.isdigit() else (reference, 0))
+        elif kind == "#.":
+            message.comments.append(text)
+        elif kind == "#,":
+            message.flags += [flag.strip() for flag in text.split(",")]
+
+    return message
+
+
+def extract_messages_with_xgettext(
+    project_dir: Path, files: List[str], xgettext_args: List[str] = DEFAULT_XGETTEXT_ARGS
+) -> List[Message]:
+    """Extracts the messages of the file types not handled natively."""
+
+    if len(files) == 0:
+        return []
+
+    output = subprocess.run(
+        [
+            "xgettext",
+            *xgettext_args,
+            "--omit-header",
+            "--output=-",
+            "--directory",
+            str(project_dir),
+            *files,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    return parse_po_messages(output)
+
+
+def extract_file_messages(
+    file: str, data: bytes, keywords: Dict[str, KeywordSpec] = RUST_KEYWORDS
+) -> Optional[List[Message]]:
+    """Returns the messages of the file, or None if its type is not handled natively."""
+
+    if file.endswith(".rs"):
+        return extract_rust_messages(data.decode("utf-8"), file, keywords)
+
+    if file.endswith(".ui"):
+        return extract_ui_messages(data, file)
+
+    return None
+
+
+def split_messages_per_file(messages: List[Message]) -> Dict[str, List[Message]]:
+    """Splits the messages so that each only has the references of a single file."""
+
+    messages_per_file: Dict[str, List[Message]] = {}
+
+    for message in messages:
+        for path in dict.fromkeys(path for path, _ in message.references):
+            messages_per_file.setdefault(path, []).append(
+                replace(message, references=[reference for reference in message.references if reference[0] == path])
+            )
+
+    return messages_per_file
+
+
+class MessageCache:
+    """On-disk cache of the messages extracted from each file.
+
+    The messages of a file are only reused if the hash of its contents did
+    not change and they were extracted by the same EXTRACTOR_VERSION.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+
+        try:
+            with path.open() as file:
+                self._entries: Dict[str, Dict[str, Any]] = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    def get(self, file: str, digest: str) -> Optional[List[Message]]:
+        entry = self._entries.get(file)
+
+        if entry is None or entry["hash"] != digest or entry.get("version") != EXTRACTOR_VERSION:
+            return None
+
+        return [message_from_dict(message) for message in entry["messages"]]
+
+    def insert(self, file: str, digest: str, messages: List[Message]) -> None:
+        self._entries[file] = {
+            "version": EXTRACTOR_VERSION,
+            "hash": digest,
+            "messages": [asdict(message) for message in messages],
+        }
+
+    def save(self, files: List[str]) -> None:
+        """Saves the entries of `files`, dropping the ones of other files."""
+
+        entries = {file: self._entries[file] for file in files if file in self._entries}
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+        gitignore = self._path.parent / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("*\n")
+
+        utils.write_file(self._path, json.dumps(entries, sort_keys=True).encode())
+
+
+def message_from_dict(message: Dict[str, Any]) -> Message:
+    return Message(
+        message["msgid"],
+        msgctxt=message["msgctxt"],
+        msgid_plural=message["msgid_plural"],
+        references=[(path, line) for path, line in message["references"]],
+        comments=message["comments"],
+        flags=message["flags"],
+    )
+
+
+def merge_messages(messages: Iterable[Message]) -> List[Message]:
+    """Merges the messages with the same context and msgid, keeping the first order."""
+
+    merged: Dict[Tuple[Optional[str], str], Message] = {}
+
+    for message in messages:
+        existing = merged.get(message.key())
+
+        if existing is None:
+            merged[message.key()] = Message(
+                message.msgid,
+                msgctxt=message.msgctxt,
+                msgid_plural=message.msgid_plural,
+                references=list(message.references),
+                comments=list(message.comments),
+                flags=list(message.flags),
+            )
+            continue
+
+        existing.msgid_plural = existing.msgid_plural or message.msgid_plural
+        existing.references += message.references
+        existing.comments += [comment for comment in message.comments if comment not in existing.comments]
+        existing.flags += [flag for flag in message.flags if flag not in existing.flags]
+
+    return list(merged.values())
+
+
+def format_po_string(keyword: str, value: str) -> List[str]:
+    escaped = "".join(PO_ESCAPES.get(char, char) for char in value)
+
+    if "\\n" not in escaped[:-2]:
+        return [f'{keyword} "{escaped}"']
+
+    lines = [f'{keyword} ""']
+    for part in re.findall(r".*?\\n|.+$", escaped):
+        lines.append(f'"{part}"')
+
+    return lines
+
+
+def format_references(references: List[Tuple[str, int]]) -> List[str]:
+    lines: List[str] = []
+    current = "#:"
+
+    for path, line in references:
+        reference = f"{path}:{line}"
+
+        if len(current) + 1 + len(reference) > 79 and current != "#:":
+            lines.append(current)
+            current = "#:"
+
+        current += f" {reference}"
+
+    if current != "#:":
+        lines.append(current)
+
+    return lines
+
+
+def format_message(message: Message) -> List[str]:
+    lines = [f"#. {comment}" for comment in message.comments]
+    lines += format_references(message.references)
+
+    if message.flags:
+        lines.append(f"#, {', '.join(message.flags)}")
+
+    if message.msgctxt is not None:
+        lines += format_po_string("msgctxt", message.msgctxt)
+
+    lines += format_po_string("msgid", message.msgid)
+
+    if message.msgid_plural is not None:
+        lines += format_po_string("msgid_plural", message.msgid_plural)
+        lines += ['msgstr[0] ""', 'msgstr[1] ""']
+    else:
+        lines.append('msgstr ""')
+
+    return lines
+
+
+def format_pot(messages: List[Message], package: str, creation_date: Optional[str] = None) -> str:
+    if creation_date is None:
+        creation_date = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M%z")
+
+    lines = [
+        "# SOME DESCRIPTIVE TITLE.",
+        "# Copyright (C) YEAR THE PACKAGE'S COPYRIGHT HOLDER",
+        f"# This file is distributed under the same license as the {package} package.",
+        "# FIRST AUTHOR <EMAIL@ADDRESS>, YEAR.",
+        "#",
+        "#, fuzzy",
+        'msgid ""',
+        'msgstr ""',
+        f'"Project-Id-Version: {package}\\n"',
+        '"Report-Msgid-Bugs-To: \\n"',
+        f'"POT-Creation-Date: {creation_date}\\n"',
+        '"PO-Revision-Date: YEAR-MO-DA HO:MI+ZONE\\n"',
+        '"Last-Translator: FULL NAME <EMAIL@ADDRESS>\\n"',
+        '"Language-Team: LANGUAGE <LL@li.org>\\n"',
+        '"Language: \\n"',
+        '"MIME-Version: 1.0\\n"',
+        '"Content-Type: text/plain; charset=UTF-8\\n"',
+        '"Content-Transfer-Encoding: 8bit\\n"',
+        '"Plural-Forms: nplurals=INTEGER; plural=EXPRESSION;\\n"',
+    ]
+
+    for message in messages:
+        lines.append("")
+        lines += format_message(message)
+
+    return "\n".join(lines) + "\n"
+
+
+def read_potfiles(project_dir: Path) -> List[str]:
+    """Returns the files listed in po/POTFILES.in, relative to the project directory."""
+
+    with (project_dir / "po" / "POTFILES.in").open() as potfiles_file:
+        return [
+            line.strip()
+            for line in potfiles_file.readlines()
+            if line.strip() and not line.startswith("#") and not line.startswith("[encoding:")
+        ]
+
+
+def extract_messages(
+    project_dir: Path,
+    files: List[str],
+    cache: Optional[MessageCache] = None,
+    xgettext_args: List[str] = DEFAULT_XGETTEXT_ARGS,
+) -> List[Message]:
+    """Extracts the messages of the files, sorted by file and line.
+
+    The keywords of `xgettext_args` are also recognized in the Rust files.
+    Only the files that changed since they were put in `cache` are parsed
+    again. Raises an ExtractionError listing the files that could not be parsed.
+    """
+
+    files = sorted(set(files))
+    keywords = parse_keyword_args(xgettext_args)
+    # The arguments change what is extracted, so they are part of the digests
+    salt = json.dumps(xgettext_args).encode() + b"\0"
+    digests: Dict[str, str] = {}
+    messages_per_file: Dict[str, List[Message]] = {}
+    other_files: List[str] = []
+    errors: Dict[str, str] = {}
+
+    for file in files:
+        data = (project_dir / file).read_bytes()
+        digests[file] = hashlib.sha256(salt + data).hexdigest()
+
+        messages = cache.get(file, digests[file]) if cache is not None else None
+        if messages is None:
+            try:
+                messages = extract_file_messages(file, data, keywords)
+            except (UnicodeDecodeError, expat.ExpatError) as error:
+                errors[file] = str(error)
+                continue
+
+        if messages is None:
+            other_files.append(file)
+        else:
+            messages_per_file[file] = messages
+
+    if len(errors) > 0:
+        raise ExtractionError(errors)
+
+    xgettext_messages = split_messages_per_file(
+        extract_messages_with_xgettext(project_dir, other_files, xgettext_args)
+    )
+    for file in other_files:
+        messages_per_file[file] = xgettext_messages.get(file, [])
+
+    if cache is not None:
+        for file, messages in messages_per_file.items():
+            cache.insert(file, digests[file], messages)
+
+    return merge_messages(
+        message for file in files for message in messages_per_file[file]
+    )
+
+
+def generate_pot(
+    project_dir: Path,
+    package: str,
+    output: Path,
+    cache_path: Optional[Path] = None,
+    xgettext_args: List[str] = DEFAULT_XGETTEXT_ARGS,
+) -> bool:
+    """Writes the pot file for the files in POTFILES without modifying the sources.
+
+    The file is left untouched if the messages did not change. Returns whether it was written.
+    """
+
+    files = read_potfiles(project_dir)
+    cache = MessageCache(cache_path) if cache_path is not None else None
+    messages = extract_messages(project_dir, files, cache, xgettext_args)
+
+    if cache is not None:
+        cache.save(files)
+
+    try:
+        old_content: Optional[str] = output.read_text()
+    except FileNotFoundError:
+        old_content = None
+
+    if old_content is not None:
+        # Keep the creation date so that unchanged pot files stay byte-identical
+        match = re.search(r'"POT-Creation-Date: (.*)\\n"', old_content)
+        if match and format_pot(messages, package, match.group(1)) == old_content:
+            return False
+
+    utils.write_file(output, format_pot(messages, package).encode())
+    return True
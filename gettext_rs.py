@@ -1,14 +1,30 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import shutil
 import subprocess
+import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
+import gettext_extractor
 import utils
 from utils import info, c_input
 
 
+# The arguments added by meson's glib preset of i18n.gettext
+GLIB_PRESET_ARGS = [
+    "--keyword=_",
+    "--keyword=N_",
+    "--keyword=C_:1c,2",
+    "--keyword=NC_:1c,2",
+    "--keyword=g_dcgettext:2",
+    "--keyword=g_dngettext:2,3",
+    "--keyword=g_dpgettext2:2c,3",
+]
+
+
 class Project:
     def __init__(self, directory: Path, src_dir: Path, build_dir: Path):
         self.directory = directory
@@ -27,6 +43,94 @@ class Project:
 
         return matches[0]
 
+    def extract_pot_file(self, use_cache: bool = True) -> None:
+        if self.project_name is None:
+            info("Project name not found in meson build file")
+            info("Skipping pot file generation...")
+            return
+
+        pot_file = self.directory / "po" / f"{self.project_name}.pot"
+        cache_file = self.directory / ".cache" / "gettext_rs" / "messages.json"
+
+        info("Extracting translatable strings...")
+        if gettext_extractor.generate_pot(
+            self.directory,
+            self.project_name,
+            pot_file,
+            cache_path=cache_file if use_cache else None,
+            xgettext_args=self._get_xgettext_args(),
+        ):
+            info(f"Pot file has been successfully generated at '{pot_file}'")
+        else:
+            info(f"Pot file at '{pot_file}' is already up to date")
+
+    def create_overlay(self, overlay_dir: Path) -> None:
+        """Stages POTFILES and the files it lists into `overlay_dir`, with 'gettext!' replaced.
+
+        Only the Rust files using the macros are rewritten; the rest are
+        hard linked, or copied if that is not possible.
+        """
+
+        info(f"Staging sources with 'gettext!' replaced into '{overlay_dir}'...")
+
+        files = ["po/POTFILES.in", *gettext_extractor.read_potfiles(self.directory)]
+        n_rewritten = 0
+
+        for file in files:
+            source = self.directory / file
+            target = overlay_dir / file
+            target.parent.mkdir(parents=True, exist_ok=True)
+
+            content = source.read_bytes() if source.suffix == ".rs" else b""
+
+            if b"gettext!" in content:
+                target.write_bytes(content.replace(b"gettext!", b"gettext"))
+                n_rewritten += 1
+            else:
+                link_or_copy(source, target)
+
+        info(f"Successfully staged {len(files)} files, {n_rewritten} of them rewritten")
+
+    def generate_pot_files_from_overlay(self, overlay_dir: Path) -> None:
+        pot_file = self.directory.resolve() / "po" / f"{self.project_name}.pot"
+
+        info("Generating pot file from the overlay...")
+        subprocess.run(
+            [
+                "xgettext",
+                f"--package-name={self.project_name}",
+                "--directory",
+                overlay_dir,
+                "--files-from",
+                overlay_dir / "po" / "POTFILES.in",
+                "--output",
+                pot_file,
+                *self._get_xgettext_args(),
+            ],
+            check=True,
+        )
+        info(f"Pot file has been successfully generated at '{pot_file}'")
+
+    def _get_xgettext_args(self) -> List[str]:
+        """Returns the xgettext arguments meson would use, as configured in po/meson.build."""
+
+        args = list(gettext_extractor.DEFAULT_XGETTEXT_ARGS)
+
+        try:
+            with (self.directory / "po" / "meson.build").open() as file:
+                po_meson_build = file.read()
+        except FileNotFoundError:
+            return args
+
+        if re.search(r"preset\s*:\s*'glib'", po_meson_build):
+            args += GLIB_PRESET_ARGS
+
+        match = re.search(r"args\s*:\s*\[(.*?)\]", po_meson_build, re.DOTALL)
+        if match:
+            args += re.findall(r"'([^']*)'", match.group(1))
+
+        return args
+
     def replace_gettext_macros(self) -> None:
         info("Replacing 'gettext!' with 'gettext'...")
         subprocess.run(
@@ -59,15 +163,36 @@ class Project:
         info("The src directory has been restored to previous state")
 
 
-def main(src_dir: Path, build_dir: Path) -> None:
+def link_or_copy(source: Path, target: Path) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def generate_with_overlay(project: Project) -> None:
+    if project.project_name is None:
+        info("Project name not found in meson build file")
+        info("Skipping pot file generation...")
+        return
+
+    # Stay on the same filesystem as the build dir, so the files can be hard linked
+    overlay_parent = project.build_dir if project.build_dir.is_dir() else None
+
+    with tempfile.TemporaryDirectory(prefix="gettext-rs-", dir=overlay_parent) as overlay_dir:
+        try:
+            project.create_overlay(Path(overlay_dir))
+            project.generate_pot_files_from_overlay(Path(overlay_dir))
+        except (subprocess.CalledProcessError, FileNotFoundError) as error:
+            info(f"An error has occured: {error}")
+
+
+def generate_with_ninja(project: Project) -> None:
     if c_input(
         "Commit or stash unsaved changes before proceeding. Proceed? [y/N]"
     ) not in ("y", "Y"):
         return
 
-    project_dir = src_dir.parent
-    project = Project(project_dir, src_dir, build_dir)
-
     try:
         project.replace_gettext_macros()
         project.generate_pot_files()
@@ -76,6 +201,26 @@ def main(src_dir: Path, build_dir: Path) -> None:
     finally:
         project.restore_directory()
 
+
+def main(
+    src_dir: Path, build_dir: Path, mode: str = "native", use_cache: bool = True
+) -> None:
+    project_dir = src_dir.parent
+    project = Project(project_dir, src_dir, build_dir)
+
+    if mode == "ninja":
+        generate_with_ninja(project)
+    elif mode == "overlay":
+        generate_with_overlay(project)
+    else:
+        try:
+            project.extract_pot_file(use_cache)
+        except (subprocess.CalledProcessError, FileNotFoundError) as error:
+            info(f"An error has occured: {error}")
+        except gettext_extractor.ExtractionError as error:
+            for file, message in error.errors.items():
+                info(f"Failed to parse '{file}': {message}")
+
     info(f"Project src dir found was {project.src_dir}")
     info(f"Project build dir found was {project.build_dir}")
     info(f"Project name found was {project.project_name}")
@@ -101,6 +246,18 @@ if __name__ == "__main__":
         default=Path(os.getcwd()) / "_build",
         help="The building directory",
     )
+    parser.add_argument(
+        "-m",
+        "--mode",
+        choices=["native", "overlay", "ninja"],
+        default="native",
+        help="How to generate the pot file: extract the strings in memory, run xgettext on a rewritten copy of the sources, or run the ninja pot target on temporarily rewritten sources",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every file again instead of reusing the messages of unchanged files",
+    )
     args = parser.parse_args()
 
-    main(args.src_dir, args.build_dir)
+    main(args.src_dir, args.build_dir, args.mode, not args.no_cache)
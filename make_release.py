@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 
+import functools
+import glob
 import os
+import re
 import subprocess
+import sys
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Callable, Dict, Optional, List, Set, Tuple
+from xml.parsers import expat
+from xml.sax.saxutils import escape
 
 import utils
 from utils import info, c_input
@@ -19,7 +27,138 @@ def show_diff_main_branch_from_last_tagged(
     utils.launch_web_for_uri(uri)
 
 
-def create_new_release_template(header: str, body: List[str], version: str) -> str:
+@dataclass
+class ReleaseOptions:
+    """How each step of the release is run.
+
+    The steps set to None are asked for, unless `assume_yes` is set, in
+    which case nothing is ever prompted and they are all run.
+    """
+
+    assume_yes: bool = False
+    fetch: bool = True
+    notes_file: Optional[Path] = None
+    draft_notes: bool = False
+    commit: Optional[bool] = None
+    push: Optional[bool] = None
+    open_browser: Optional[bool] = None
+
+
+def confirm(question: str, choice: Optional[bool], assume_yes: bool) -> bool:
+    if choice is not None:
+        return choice
+
+    if assume_yes:
+        info(f"{question} Assuming yes")
+        return True
+
+    return c_input(f"{question} [y/N]") in ("y", "Y")
+
+
+def read_release_notes(notes_file: Path) -> Tuple[str, List[str]]:
+    """Reads release notes whose first line is the header and the rest the items.
+
+    A `notes_file` of `-` reads them from the standard input.
+    """
+
+    if str(notes_file) == "-":
+        lines = sys.stdin.readlines()
+    else:
+        with notes_file.open() as file:
+            lines = file.readlines()
+
+    lines = [line.strip() for line in lines if line.strip()]
+
+    if len(lines) == 0:
+        raise ValueError(f"Release notes at '{notes_file}' are empty")
+
+    return (lines[0], lines[1:])
+
+
+class Git:
+    """Runs git in a repository, remembering the output of read-only queries.
+
+    The remembered outputs are forgotten whenever the repository is changed
+    through `run`.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory.resolve()
+        self._queries: Dict[Tuple[str, ...], str] = {}
+        self._fetch_process: Optional["subprocess.Popen[bytes]"] = None
+
+    def query(self, *args: str) -> str:
+        if args not in self._queries:
+            self._queries[args] = subprocess.run(
+                ["git", *args],
+                cwd=self.directory,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.rstrip()
+
+        return self._queries[args]
+
+    def run(self, *args: str) -> None:
+        self._queries.clear()
+        subprocess.run(["git", *args], cwd=self.directory, check=True)
+
+    def add(self, files: List[Path]) -> None:
+        self.run("add", "--", *(str(file.resolve()) for file in files))
+
+    def start_fetch(self) -> None:
+        """Starts `git fetch` in the background. Call `wait_for_fetch` to join it."""
+
+        if self._fetch_process is None:
+            # It must not prompt for credentials, as it shares the terminal with our prompts
+            self._fetch_process = subprocess.Popen(
+                ["git", "fetch", "--quiet"],
+                cwd=self.directory,
+                stdin=subprocess.DEVNULL,
+                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+            )
+
+    def wait_for_fetch(self) -> bool:
+        """Waits for the fetch started by `start_fetch`, returning whether one ran."""
+
+        if self._fetch_process is None:
+            return False
+
+        process = self._fetch_process
+        self._fetch_process = None
+        self._queries.clear()
+
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+
+        return True
+
+    def cancel_fetch(self) -> None:
+        if self._fetch_process is not None:
+            self._fetch_process.terminate()
+            self._fetch_process.wait()
+            self._fetch_process = None
+
+
+def draft_release_notes(git: Git, last_tagged_version: str) -> Tuple[str, List[str]]:
+    """Drafts release notes from the subjects of the commits since the last tag."""
+
+    subjects = git.query(
+        "log", "--no-merges", "--format=%s", f"{last_tagged_version}..HEAD"
+    ).splitlines()
+
+    body = [
+        subject
+        for subject in reversed(subjects)
+        if subject and not subject.startswith("chore: Bump to")
+    ]
+
+    return ("This release contains the following changes:", body)
+
+
+def create_new_release_template(
+    header: str, body: List[str], version: str, indent: str = "    "
+) -> str:
     date_now = datetime.now().strftime("%Y-%m-%d")
     new_release_xml = [
         '<release version="{}" date="{}">'.format(version, date_now),
@@ -37,36 +176,185 @@ def create_new_release_template(header: str, body: List[str], version: str) -> s
         "</release>",
     ]
 
-    new_release_xml = [f"    {line}\n" for line in new_release_xml]
+    new_release_xml = [f"{indent}{line}\n" for line in new_release_xml]
     return "".join(new_release_xml)
 
 
+class Metainfo:
+    """An AppStream metainfo file, parsed once.
+
+    New releases are spliced into the original bytes, so the formatting,
+    comments and entities of the rest of the file are left as they are.
+    """
+
+    RELEASES_TAG_REGEX = re.compile(rb"<releases(?:\s[^>]*)?(?P<empty>/)?>")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.homepage: Optional[str] = None
+        self.release_versions: List[str] = []
+
+        self._data = path.read_bytes()
+        self._releases_offset: Optional[int] = None
+        self._homepage_text: Optional[List[str]] = None
+
+        self._parser = expat.ParserCreate()
+        self._parser.StartElementHandler = self._on_start_element
+        self._parser.EndElementHandler = self._on_end_element
+        self._parser.CharacterDataHandler = self._on_character_data
+        self._parser.Parse(self._data, True)
+
+    def _on_start_element(self, name: str, attributes: Dict[str, str]) -> None:
+        if name == "releases" and self._releases_offset is None:
+            self._releases_offset = self._parser.CurrentByteIndex
+        elif name == "release" and "version" in attributes:
+            self.release_versions.append(attributes["version"])
+        elif name == "url" and attributes.get("type") == "homepage":
+            self._homepage_text = []
+
+    def _on_character_data(self, data: str) -> None:
+        if self._homepage_text is not None:
+            self._homepage_text.append(data)
+
+    def _on_end_element(self, name: str) -> None:
+        if name == "url" and self._homepage_text is not None:
+            self.homepage = self.homepage or "".join(self._homepage_text).strip()
+            self._homepage_text = None
+
+    def add_release(self, header: str, body: List[str], version: str) -> bool:
+        """Writes a new release as the first of `<releases>`, returning whether it was added.
+
+        The notes are escaped, as they are plain text. Nothing is written if
+        there is no `<releases>` or the version is already released, and an
+        ExpatError is raised if the result would not be well-formed.
+        """
+
+        if self._releases_offset is None or version in self.release_versions:
+            return False
+
+        match = self.RELEASES_TAG_REGEX.match(self._data, self._releases_offset)
+        if match is None:
+            return False
+
+        line_start = self._data.rfind(b"\n", 0, match.start()) + 1
+        indent = self._data[line_start:match.start()].decode()
+        if indent.strip():
+            indent = "  "
+
+        release = create_new_release_template(
+            escape(header), [escape(line) for line in body], version, indent + "  "
+        )
+
+        if match.group("empty"):
+            new_tag = f"<releases>\n{release}{indent}</releases>".encode()
+            data = self._splice(match.start(), match.end(), new_tag)
+        else:
+            line_end = self._data.find(b"\n", match.end())
+            if line_end != -1 and not self._data[match.end():line_end].strip():
+                data = self._splice(line_end + 1, line_end + 1, release.encode())
+            else:
+                data = self._splice(match.end(), match.end(), f"\n{release}{indent}".encode())
+
+        expat.ParserCreate().Parse(data, True)
+
+        utils.write_file(self.path, data)
+        self._data = data
+        self.release_versions.insert(0, version)
+        return True
+
+    def _splice(self, start: int, end: int, data: bytes) -> bytes:
+        return self._data[:start] + data + self._data[end:]
+
+
 class Project:
+    """A project to release.
+
+    Its files are only looked for when first needed, so creating a Project
+    is cheap.
+    """
+
     def __init__(self, directory: Path):
         self.directory = directory
-        self.files = os.listdir(self.directory)
+        self.git = Git(directory)
+        self._background_threads: List[threading.Thread] = []
+        self._metainfo: Optional[Metainfo] = None
+        self._metainfo_error: Optional[expat.ExpatError] = None
+
+    @functools.cached_property
+    def files(self) -> Set[str]:
+        with os.scandir(self.directory) as entries:
+            return {entry.name for entry in entries}
+
+    @functools.cached_property
+    def metainfo_file(self) -> Optional[Path]:
+        if "data" not in self.files:
+            return None
 
-        self.metainfo_file = self._get_metainfo_file()
-        self.meson_build_file = self._get_meson_build_file()
-        self.cargo_toml_file = self._get_cargo_toml_file()
+        with os.scandir(self.directory / "data") as entries:
+            candidates = sorted(
+                entry.name
+                for entry in entries
+                if "metainfo" in entry.name or "appdata" in entry.name
+            )
 
-    def _get_metainfo_file(self) -> Optional[Path]:
-        data_files = os.listdir(self.directory / "data")
-        for file in data_files:
-            if "metainfo" in file or "appdata" in file:
-                return self.directory / "data" / file
-        return None
+        if len(candidates) == 0:
+            return None
+
+        return self.directory / "data" / candidates[0]
+
+    def get_metainfo(self) -> Optional[Metainfo]:
+        """Returns the parsed metainfo, or None if there is none or it is not well-formed."""
+
+        if self._metainfo is None and self._metainfo_error is None and self.metainfo_file is not None:
+            try:
+                self._metainfo = Metainfo(self.metainfo_file)
+            except expat.ExpatError as error:
+                info(f"Failed to parse metainfo file at '{self.metainfo_file}': {error}")
+                self._metainfo_error = error
+
+        return self._metainfo
 
-    def _get_meson_build_file(self) -> Optional[Path]:
+    @functools.cached_property
+    def meson_build_file(self) -> Optional[Path]:
         if "meson.build" in self.files:
             return self.directory / "meson.build"
         return None
 
-    def _get_cargo_toml_file(self) -> Optional[Path]:
+    @functools.cached_property
+    def cargo_toml_file(self) -> Optional[Path]:
         if "Cargo.toml" in self.files:
             return self.directory / "Cargo.toml"
         return None
 
+    @functools.cached_property
+    def cargo_lock_file(self) -> Optional[Path]:
+        if "Cargo.lock" in self.files:
+            return self.directory / "Cargo.lock"
+        return None
+
+    @functools.cached_property
+    def cargo_toml_files(self) -> List[Path]:
+        """The root Cargo.toml followed by the ones of its workspace members."""
+
+        if self.cargo_toml_file is None:
+            return []
+
+        members_match = re.search(
+            r"^members\s*=\s*\[(.*?)\]",
+            self.cargo_toml_file.read_text(),
+            re.DOTALL | re.MULTILINE,
+        )
+        if members_match is None:
+            return [self.cargo_toml_file]
+
+        member_files = [
+            Path(member) / "Cargo.toml"
+            for pattern in re.findall(r'"([^"]*)"', members_match.group(1))
+            for member in sorted(glob.glob(str(self.directory / pattern)))
+        ]
+
+        return [self.cargo_toml_file, *(file for file in member_files if file.exists())]
+
     def _update_meson_version(self) -> None:
         if self.meson_build_file is None:
             info("Meson build file not found")
@@ -89,30 +377,70 @@ class Project:
             info("Skipping cargo version update...")
             return
 
-        info(f"Cargo toml file found at '{self.cargo_toml_file}'")
-        info("Replacing cargo toml version with new_version...")
+        # Anchored, so the versions of the dependencies are left alone, as are
+        # the members inheriting the version of the workspace
+        version_pattern = r'^version\s*=\s*"(.*)"'
+        root_versions = utils.find_in_file(f"(?m){version_pattern}", self.cargo_toml_file)
 
-        utils.find_and_replace_in_file(
-            r'version\s*=\s*"(.*)"',
-            f'version = "{self.new_version}"',
-            self.cargo_toml_file,
+        # Only bump the members that are released along with the project
+        member_version_pattern = (
+            f'^version\\s*=\\s*"{re.escape(root_versions[0])}"'
+            if len(root_versions) > 0
+            else version_pattern
         )
-        info("Successfully replaced cargo toml's version with new version")
-
-    def _update_metainfo_release_notes(self) -> None:
-        if self.metainfo_file is None:
-            info("Metainfo file not found")
-            info("Skipping metainfo release notes update...")
-            return
 
+        for cargo_toml_file in self.cargo_toml_files:
+            info(f"Cargo toml file found at '{cargo_toml_file}'")
+            info("Replacing cargo toml version with new_version...")
+
+            if utils.find_and_replace_in_file(
+                version_pattern
+                if cargo_toml_file == self.cargo_toml_file
+                else member_version_pattern,
+                f'version = "{self.new_version}"',
+                cargo_toml_file,
+            ):
+                info("Successfully replaced cargo toml's version with new version")
+            else:
+                info("Cargo toml has no version of its own to replace")
+
+    def get_release_notes(
+        self, options: ReleaseOptions
+    ) -> Optional[Tuple[str, List[str]]]:
+        if options.notes_file is not None:
+            info(f"Reading release notes from '{options.notes_file}'...")
+            return read_release_notes(options.notes_file)
+
+        if options.draft_notes or options.assume_yes:
+            try:
+                last_tagged_version = self.get_last_tagged_version()
+            except subprocess.CalledProcessError:
+                info("No tagged version to draft the release notes from")
+                return None
+
+            info(f"Drafting release notes from the commits since {last_tagged_version}...")
+            return draft_release_notes(self.git, last_tagged_version)
+
+        return self._ask_release_notes()
+
+    def _ask_release_notes(self) -> Optional[Tuple[str, List[str]]]:
         homepage_uri = self.get_repo_homepage()
         if not homepage_uri:
             info("No homepage uri found")
             info("Skipping show diff of main branch from last tagged")
         else:
-            info("Showing changes from last tagged version to main branch...")
-            last_tagged_version = self.get_last_tagged_version()
-            show_diff_main_branch_from_last_tagged(homepage_uri, last_tagged_version)
+            try:
+                last_tagged_version: Optional[str] = self.get_last_tagged_version()
+            except subprocess.CalledProcessError:
+                info("No tagged version to show the changes from")
+                last_tagged_version = None
+
+            if last_tagged_version is not None:
+                info("Showing changes from last tagged version to main branch...")
+                # Opening the browser may take a while, so do not keep gedit waiting on it
+                self._run_in_background(
+                    show_diff_main_branch_from_last_tagged, homepage_uri, last_tagged_version
+                )
 
         info("Launching Gedit...")
         info("Write the release notes in the window and save the file")
@@ -120,112 +448,185 @@ class Project:
         output = utils.get_user_input_from_gedit()
         if output is None:
             info("Failed to get release notes")
-            info("Skipping metainfo release notes update...")
-            return
+            return None
 
-        header = output.pop(0)
-        body = output
+        return (output[0], output[1:])
 
-        info(f"Metainfo file found at '{self.metainfo_file}'")
-        info("Updating the metainfo file with the provided release notes and version")
+    def _update_metainfo_release_notes(
+        self, release_notes: Optional[Tuple[str, List[str]]], use_clipboard: bool
+    ) -> None:
+        if self.metainfo_file is None:
+            info("Metainfo file not found")
+            info("Skipping metainfo release notes update...")
+            return
 
-        with self.metainfo_file.open(mode="r+") as file:
-            file_lines = file.readlines()
-            for index, line in enumerate(file_lines):
-                if "<releases>" in line:
-                    release_template = create_new_release_template(
-                        header, body, self.new_version
-                    )
-                    file_lines.insert(index + 1, release_template)
-            file.truncate(0)
-            file.seek(0)
-            file.writelines(file_lines)
+        if release_notes is None:
+            info("No release notes given")
+            info("Skipping metainfo release notes update...")
+            return
 
-        info("Successfully updated metainfo with latest release")
+        header, body = release_notes
+        self.write_metainfo_release(header, body)
 
         release_note_lines = [f"* {line}" for line in body]
         release_note_lines.insert(0, header)
         release_note = "\n".join(release_note_lines)
 
+        if use_clipboard:
+            try:
+                utils.copy_to_clipboard(release_note)
+                info(f"Copied release notes for version {self.new_version} to clipboard")
+                info("You can now paste the release note to github and make a release")
+                return
+            except (FileNotFoundError, subprocess.CalledProcessError):
+                info("Failed to copy release_note to clipboard")
+
+        info(f"Printing the release notes for version {self.new_version}...")
+        print(release_note)
+        info("Copy and paste this release note to github and make a release")
+
+    def write_metainfo_release(self, header: str, body: List[str]) -> None:
+        metainfo = self.get_metainfo()
+        if metainfo is None:
+            if self.metainfo_file is None:
+                info("Metainfo file not found")
+            info("Skipping metainfo release notes update...")
+            return
+
+        info(f"Metainfo file found at '{metainfo.path}'")
+        info("Updating the metainfo file with the provided release notes and version")
+
         try:
-            utils.copy_to_clipboard(release_note)
-            info(f"Copied release notes for version {self.new_version} to clipboard")
-            info("You can now paste the release note to github and make a release")
-        except FileNotFoundError:
-            info("Failed to copy release_note to clipboard")
-            info(
-                f"Printing the release notes for version {self.new_version} instead..."
-            )
-            print(release_note)
-            info("Copy and paste this release note to github and make a release")
+            added = metainfo.add_release(header, body, self.new_version)
+        except expat.ExpatError as error:
+            info(f"The metainfo would not be well-formed with the new release: {error}")
+            info("Skipping metainfo release notes update...")
+            return
+
+        if added:
+            info("Successfully updated metainfo with latest release")
+        elif self.new_version in metainfo.release_versions:
+            info(f"Metainfo already has a release for version {self.new_version}")
+        else:
+            info("Metainfo has no <releases>")
+            info("Skipping metainfo release notes update...")
 
     def get_repo_homepage(self) -> Optional[str]:
-        if not self.metainfo_file:
+        metainfo = self.get_metainfo()
+        if metainfo is None:
             return None
 
-        matches = utils.find_in_file('type="homepage">(.*)<', self.metainfo_file)
+        return metainfo.homepage or None
 
-        if len(matches) < 1:
-            return None
+    def get_last_tagged_version(self) -> str:
+        return self.git.query("describe", "--tags", "--abbrev=0")
 
-        return matches[0]
+    def set_new_version(
+        self,
+        new_version: str,
+        release_notes: Optional[Tuple[str, List[str]]],
+        use_clipboard: bool = True,
+    ) -> None:
+        self.update_version(new_version)
+        self._update_metainfo_release_notes(release_notes, use_clipboard)
+
+    def update_version(self, new_version: str) -> None:
+        """Updates the version in Cargo.toml and meson.build without asking for release notes."""
+
+        # Parse it first, so a broken metainfo is reported before anything is changed
+        self.get_metainfo()
 
-    def get_last_tagged_version(self) -> str:
-        return subprocess.run(
-            ["git", "describe", "--tags", "--abbrev=0"],
-            check=True,
-            capture_output=True,
-            text=True,
-        ).stdout.rstrip()
-
-    def set_new_version(self, new_version: str) -> None:
         self.new_version = new_version
         self._update_cargo_version()
         self._update_meson_version()
-        self._update_metainfo_release_notes()
+
+    def get_new_release_uri(self) -> Optional[str]:
+        homepage_uri = self.get_repo_homepage()
+
+        if homepage_uri is None:
+            return None
+
+        return os.path.join(homepage_uri, "releases", "new")
 
     def fetch_origin(self) -> None:
-        info("Running git fetch...")
-        subprocess.run(["git", "fetch"], check=True)
-        info("Sucessfully run git fetch")
+        info("Running git fetch in the background...")
+        self.git.start_fetch()
+
+    def _run_in_background(self, function: Callable[..., None], *args: Any) -> None:
+        thread = threading.Thread(target=function, args=args)
+        thread.start()
+        self._background_threads.append(thread)
+
+    def wait_for_background_tasks(self) -> None:
+        """Joins the fetch and the other steps started in the background."""
+
+        for thread in self._background_threads:
+            thread.join()
+        self._background_threads.clear()
+
+        try:
+            if self.git.wait_for_fetch():
+                info("Sucessfully run git fetch")
+        except subprocess.CalledProcessError:
+            info("Failed to run git fetch")
+            info("Run git fetch yourself, then run again with --no-fetch")
+            raise
+
+    def cancel_background_tasks(self) -> None:
+        self.git.cancel_fetch()
+        self.wait_for_background_tasks()
 
     def commit_changes(self) -> None:
+        files: List[Path] = []
+
         if self.metainfo_file is not None:
-            subprocess.run(["git", "add", self.metainfo_file], check=True)
-            info("Added metainfo to staged files")
+            files.append(self.metainfo_file)
+            info("Adding metainfo to staged files")
 
         if self.meson_build_file is not None:
-            subprocess.run(["git", "add", self.meson_build_file], check=True)
-            info("Added meson build to staged files")
+            files.append(self.meson_build_file)
+            info("Adding meson build to staged files")
 
         if self.cargo_toml_file is not None:
-            subprocess.run(
-                ["git", "add", self.cargo_toml_file, "Cargo.lock"], check=True
-            )
-            info("Added cargo toml to staged files")
+            files += self.cargo_toml_files
 
-        subprocess.run(
-            ["git", "commit", "-m", f"chore: Bump to {self.new_version}"], check=True
-        )
+            if self.cargo_lock_file is not None:
+                files.append(self.cargo_lock_file)
+
+            info("Adding cargo toml to staged files")
+
+        self.git.add(files)
+        self.git.run("commit", "-m", f"chore: Bump to {self.new_version}")
         info("Changes committed")
 
     def push_changes_to_remote_repo(self) -> None:
-        subprocess.run(["git", "pull", "origin", "main"], check=True)
+        self.git.run("pull", "origin", "main")
         info("Pulled changes from origin/main")
 
-        subprocess.run(["git", "push", "origin", "main"], check=True)
+        self.git.run("push", "origin", "main")
         info("Pushed local changes to origin/main")
 
 
-def main(project_directory: Path, new_version: str) -> None:
-    if c_input(
+def main(
+    project_directory: Path,
+    new_version: Optional[str],
+    options: Optional[ReleaseOptions] = None,
+) -> None:
+    options = options or ReleaseOptions()
+
+    project = Project(project_directory)
+
+    # Fetching does not touch the working tree, so it can already run while
+    # the user answers the prompts
+    if options.fetch:
+        project.fetch_origin()
+
+    if not options.assume_yes and c_input(
         "Commit or stash unsaved changes before proceeding. Proceed? [y/N]"
     ) not in ("y", "Y"):
+        project.cancel_background_tasks()
         return
 
-    project = Project(project_directory)
-    project.fetch_origin()
-
     if new_version is None:
         last_version = project.get_last_tagged_version().lstrip("v")
         new_version = c_input(
@@ -234,20 +635,33 @@ def main(project_directory: Path, new_version: str) -> None:
 
     info(f"Making release for version {new_version}...")
 
-    project.set_new_version(new_version)
+    # They would be thrown away without a metainfo to write them to
+    release_notes = (
+        project.get_release_notes(options) if project.metainfo_file is not None else None
+    )
 
-    if c_input("Do you want to commit the changes? [y/N]") in ("y", "Y"):
+    # Before any file is changed, so a failed fetch leaves the tree untouched
+    project.wait_for_background_tasks()
+
+    project.set_new_version(new_version, release_notes, not options.assume_yes)
+
+    if confirm("Do you want to commit the changes?", options.commit, options.assume_yes):
         project.commit_changes()
-        if c_input("Do you want to push the changes? [y/N]") in ("y", "Y"):
+        if confirm("Do you want to push the changes?", options.push, options.assume_yes):
             project.push_changes_to_remote_repo()
 
-    if c_input("Do you want to open a browser to create a new release? [y/N]") in (
-        "y",
-        "Y",
-    ):
-        project_homepage = project.get_repo_homepage()
-        if project_homepage is not None:
-            utils.launch_web_for_uri(os.path.join(project_homepage, "releases", "new"))
+    release_uri = project.get_new_release_uri()
+    if release_uri is None:
+        info("No homepage uri found")
+    else:
+        info(f"Create the release at '{release_uri}'")
+
+        if confirm(
+            "Do you want to open a browser to create a new release?",
+            options.open_browser,
+            options.assume_yes,
+        ):
+            utils.launch_web_for_uri(release_uri)
             info("Opened webpage to create a release")
 
     info(f"Successfuly made a new release for {new_version}...")
@@ -273,6 +687,61 @@ if __name__ == "__main__":
         required=False,
         help="The new version in format $N.$N.$N",
     )
+    parser.add_argument(
+        "-y",
+        "--yes",
+        action="store_true",
+        help="Never prompt, running every step not disabled by its flag. Requires --new-version",
+    )
+    parser.add_argument(
+        "--notes",
+        type=Path,
+        help="File with the release notes, with the header on the first line and an item per line. Use - for stdin",
+    )
+    parser.add_argument(
+        "--draft-notes",
+        action="store_true",
+        help="Draft the release notes from the commits since the last tag. Default with --yes and no --notes",
+    )
+    parser.add_argument(
+        "--fetch",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Run git fetch before the release",
+    )
+    parser.add_argument(
+        "--commit",
+        action=argparse.BooleanOptionalAction,
+        help="Commit the changes without asking",
+    )
+    parser.add_argument(
+        "--push",
+        action=argparse.BooleanOptionalAction,
+        help="Push the committed changes without asking",
+    )
+    parser.add_argument(
+        "--open-browser",
+        action=argparse.BooleanOptionalAction,
+        help="Open a browser to create the release without asking",
+    )
     args = parser.parse_args()
 
-    main(args.project_dir, args.new_version)
+    if args.yes and args.new_version is None:
+        parser.error("--yes requires --new-version")
+
+    if not args.yes and str(args.notes) == "-":
+        parser.error("reading the notes from stdin requires --yes")
+
+    main(
+        args.project_dir,
+        args.new_version,
+        ReleaseOptions(
+            args.yes,
+            args.fetch,
+            args.notes,
+            args.draft_notes,
+            args.commit,
+            args.push,
+            args.open_browser,
+        ),
+    )
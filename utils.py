@@ -1,11 +1,14 @@
+import functools
+import os
 import random
 import re
+import shutil
 import string
 import subprocess
 import tempfile
 import webbrowser
 from pathlib import Path
-from typing import Optional, List
+from typing import Callable, Optional, List, Pattern, TextIO, Tuple
 
 BOLD = "\033[1m"
 BLUE = "\033[34m"
@@ -29,20 +32,125 @@ def c_input(text: str) -> str:
     return input_colored("CONSOLE", text)
 
 
+@functools.lru_cache(maxsize=None)
+def compile_pattern(pattern: str) -> Pattern[str]:
+    return re.compile(pattern)
+
+
 def find_in_file(pattern: str, file_directory: Path) -> List[str]:
     with file_directory.open() as file:
-        return re.findall(pattern, file.read())
+        return compile_pattern(pattern).findall(file.read())
+
+
+def rewrite_file(file_directory: Path, transform: Callable[[str], str]) -> bool:
+    """Streams the file line by line through `transform`.
+
+    The temporary file is only created in the file's directory once a line
+    changed, and then atomically replaces the file, so untouched files and
+    their directory are left alone. Returns whether the file was rewritten.
+    """
+
+    n_unchanged_chars = 0
+    tmp_file: Optional[Path] = None
+
+    try:
+        with file_directory.open(newline="") as file:
+            for line in file:
+                new_line = transform(line)
+
+                if tmp_file is None and new_line == line:
+                    n_unchanged_chars += len(line)
+                    continue
+
+                if tmp_file is None:
+                    fd, tmp_file_name = tempfile.mkstemp(
+                        prefix=f".{file_directory.name}.", suffix=".tmp", dir=file_directory.parent
+                    )
+                    tmp_file = Path(tmp_file_name)
+                    new_file = os.fdopen(fd, "w", newline="")
+                    copy_chars(file_directory, new_file, n_unchanged_chars)
+
+                new_file.write(new_line)
+
+        if tmp_file is None:
+            return False
+
+        with new_file:
+            new_file.flush()
+            os.fsync(new_file.fileno())
+
+        shutil.copymode(file_directory, tmp_file)
+        os.replace(tmp_file, file_directory)
+    finally:
+        if tmp_file is not None:
+            new_file.close()
+            tmp_file.unlink(missing_ok=True)
+
+    return True
+
+
+def copy_chars(file_directory: Path, target: TextIO, n_chars: int, chunk_size: int = 65536) -> None:
+    """Copies the first `n_chars` characters of the file to `target`."""
+
+    with file_directory.open(newline="") as file:
+        while n_chars > 0:
+            chunk = file.read(min(n_chars, chunk_size))
+            if not chunk:
+                break
+
+            target.write(chunk)
+            n_chars -= len(chunk)
+
+
+def write_file(file_directory: Path, content: bytes) -> None:
+    """Atomically replaces the content of the file, through a temporary file in the same directory."""
+
+    fd, tmp_file_name = tempfile.mkstemp(
+        prefix=f".{file_directory.name}.", suffix=".tmp", dir=file_directory.parent
+    )
+    tmp_file = Path(tmp_file_name)
+
+    try:
+        with os.fdopen(fd, "wb") as new_file:
+            new_file.write(content)
+            new_file.flush()
+            os.fsync(new_file.fileno())
+
+        if file_directory.exists():
+            shutil.copymode(file_directory, tmp_file)
+
+        os.replace(tmp_file, file_directory)
+    finally:
+        tmp_file.unlink(missing_ok=True)
 
 
 def find_and_replace_in_file(
     pattern: str, replacement: str, file_directory: Path
-) -> None:
-    with file_directory.open(mode="r+") as file:
-        file_contents = file.read()
-        new_content = re.sub(pattern, replacement, file_contents, count=1)
-        file.seek(0)
-        file.truncate(0)
-        file.write(new_content)
+) -> bool:
+    return find_and_replace_all_in_file([(pattern, replacement)], file_directory)
+
+
+def find_and_replace_all_in_file(
+    replacements: List[Tuple[str, str]], file_directory: Path
+) -> bool:
+    """Replaces the first match of each pattern in a single pass over the file.
+
+    Patterns are matched line by line. Returns whether the file changed.
+    """
+
+    pending = [(compile_pattern(pattern), replacement) for pattern, replacement in replacements]
+
+    def replace_line(line: str) -> str:
+        for item in list(pending):
+            regex, replacement = item
+            line, n_replaced = regex.subn(replacement, line, count=1)
+
+            if n_replaced > 0:
+                pending.remove(item)
+
+        return line
+
+    return rewrite_file(file_directory, replace_line)
 
 
 def create_tmp_file() -> Path: